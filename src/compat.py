@@ -0,0 +1,11 @@
+"""
+Ustawienia zależne od wersji Pythona wspólne dla modułów ataków
+
+Autorzy: Projekt KRYS - Kryptografia Stosowana
+"""
+
+import sys
+
+# Argumenty @dataclass dla charakterystyk ataków: instancje bez __dict__
+# (parametr slots dostępny od Pythona 3.10)
+DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
@@ -3,8 +3,11 @@ Implementacja algorytmu DES (Data Encryption Standard)
 Autorzy: Projekt KRYS - Kryptografia Stosowana
 """
 
+import hashlib
+import os
 import numpy as np
-from typing import List, Tuple
+from functools import lru_cache
+from typing import Callable, List, Optional, Sequence, Tuple
 
 # ============================================================================
 # TABLICE PERMUTACJI I STAŁE DES
@@ -146,41 +149,89 @@ S_BOXES = [
 # FUNKCJE POMOCNICZE
 # ============================================================================
 
+# Tablice translacji bajtów: bit 0/1 <-> znak '0'/'1'
+_BITS_TO_ASCII = bytes.maketrans(b'\x00\x01', b'01')
+_ASCII_TO_BITS = bytes.maketrans(b'01', b'\x00\x01')
+
+
+def hex_to_int(hex_string: str) -> int:
+    """Konwertuje string heksadecymalny na liczbę całkowitą."""
+    # Usuwamy prefiks 0x i spacje jeśli istnieją
+    return int(hex_string.replace("0x", "").replace(" ", ""), 16)
+
+
+def int_to_hex(num: int) -> str:
+    """Konwertuje 64-bitową liczbę całkowitą na string heksadecymalny."""
+    return f"{num:016X}"
+
+
 def hex_to_bits(hex_string: str) -> List[int]:
-    """Konwertuje string heksadecymalny na listę bitów."""
-    # Usuwamy prefiks 0x jeśli istnieje
-    hex_string = hex_string.replace("0x", "").replace(" ", "")
-    # Konwertujemy na int, potem na bity
-    num = int(hex_string, 16)
-    # Konwertujemy na 64 bity (dla DES)
-    bits = []
-    for i in range(64):
-        bits.append((num >> (63 - i)) & 1)
-    return bits
+    """
+    Konwertuje string heksadecymalny na listę bitów.
+    
+    Zachowane dla zgodności - nowy kod powinien używać hex_to_int().
+    """
+    return int_to_bits(hex_to_int(hex_string), 64)
 
 
 def bits_to_hex(bits: List[int]) -> str:
-    """Konwertuje listę bitów na string heksadecymalny."""
-    num = 0
-    for bit in bits:
-        num = (num << 1) | bit
-    return format(num, '016X')
+    """
+    Konwertuje listę bitów na string heksadecymalny.
+    
+    Zachowane dla zgodności - nowy kod powinien używać int_to_hex().
+    """
+    return int_to_hex(bits_to_int(bits))
 
 
 def bits_to_int(bits: List[int]) -> int:
     """Konwertuje listę bitów na liczbę całkowitą."""
-    result = 0
-    for bit in bits:
-        result = (result << 1) | bit
-    return result
+    if not len(bits):
+        return 0
+    # bytes(ndarray) kopiuje surowy bufor (np. 8 bajtów na int64), więc
+    # tablice NumPy jawnie rzutujemy na jeden bajt na bit
+    if isinstance(bits, np.ndarray):
+        raw = np.asarray(bits, dtype=np.uint8).tobytes()
+    else:
+        raw = bytes(bits)
+    # Bity -> tekst '0101...' (translacja w C) -> int
+    return int(raw.translate(_BITS_TO_ASCII), 2)
 
 
 def int_to_bits(num: int, length: int) -> List[int]:
     """Konwertuje liczbę całkowitą na listę bitów o zadanej długości."""
-    bits = []
-    for i in range(length):
-        bits.append((num >> (length - 1 - i)) & 1)
-    return bits
+    if length <= 0:
+        return []
+    # int -> tekst '0101...' -> bajty 0/1 -> lista
+    text = format(num & ((1 << length) - 1), f'0{length}b')
+    return list(text.encode().translate(_ASCII_TO_BITS))
+
+
+def blocks_to_bits_array(blocks: np.ndarray) -> np.ndarray:
+    """
+    Konwertuje tablicę 64-bitowych bloków na macierz bitów (np.unpackbits).
+    
+    Args:
+        blocks: Bloki (np.uint64 lub lista liczb całkowitych)
+        
+    Returns:
+        Macierz uint8 (N, 64); bity od najstarszego
+    """
+    words = np.asarray(blocks, dtype=np.uint64).astype('>u8')
+    return np.unpackbits(words.view(np.uint8).reshape(-1, 8), axis=1)
+
+
+def bits_array_to_blocks(bits: np.ndarray) -> np.ndarray:
+    """
+    Konwertuje macierz bitów (N, 64) na tablicę 64-bitowych bloków (np.packbits).
+    
+    Args:
+        bits: Macierz bitów 0/1 (N, 64); bity od najstarszego
+        
+    Returns:
+        Tablica bloków (np.uint64[N])
+    """
+    packed = np.packbits(np.asarray(bits, dtype=np.uint8).reshape(-1, 64), axis=1)
+    return np.ascontiguousarray(packed).view('>u8').ravel().astype(np.uint64)
 
 
 def permute(bits: List[int], table: List[int]) -> List[int]:
@@ -193,9 +244,137 @@ def left_rotate(bits: List[int], n: int) -> List[int]:
     return bits[n:] + bits[:n]
 
 
-def xor(bits1: List[int], bits2: List[int]) -> List[int]:
-    """Wykonuje operację XOR na dwóch listach bitów."""
-    return [b1 ^ b2 for b1, b2 in zip(bits1, bits2)]
+# ============================================================================
+# PERMUTACJE NA LICZBACH CAŁKOWITYCH
+# ============================================================================
+
+def _permutation_expression(table: List[int], in_width: int, var: str = "x") -> str:
+    """
+    Zwraca wyrażenie Pythona (tekst) permutujące bity zmiennej var.
+    
+    Bity wyjścia przesuwane o tę samą liczbę pozycji są grupowane pod
+    wspólną maską - jedno przesunięcie i jeden AND na grupę.
+    """
+    out_width = len(table)
+    
+    # Przesunięcie -> maska bitów wyjścia, które ono obsługuje
+    groups = {}
+    for i, src in enumerate(table):
+        src_pos = in_width - src
+        dst_pos = out_width - 1 - i
+        shift = src_pos - dst_pos
+        groups[shift] = groups.get(shift, 0) | (1 << dst_pos)
+    
+    terms = []
+    for shift, mask in sorted(groups.items()):
+        if shift > 0:
+            terms.append(f"(({var} >> {shift}) & 0x{mask:X})")
+        elif shift < 0:
+            terms.append(f"(({var} << {-shift}) & 0x{mask:X})")
+        else:
+            terms.append(f"({var} & 0x{mask:X})")
+    
+    return " | ".join(terms)
+
+
+def _compile_permutation(name: str, table: List[int], in_width: int):
+    """
+    Generuje funkcję permutującą bity liczby całkowitej według tablicy DES.
+    
+    Tablice DES numerują bity od 1 (najstarszy bit wejścia). Bity wyjścia
+    przesuwane o tę samą liczbę pozycji są grupowane pod wspólną maską,
+    więc wygenerowana funkcja jest jednym wyrażeniem z kilku przesunięć
+    i masek (np. dla E - kilkanaście zamiast 48), bez pętli w Pythonie.
+    
+    Args:
+        name: Nazwa generowanej funkcji
+        table: Tablica permutacji (numeracja od 1)
+        in_width: Szerokość wejścia w bitach
+        
+    Returns:
+        Funkcja int -> int realizująca permutację
+    """
+    source = f"def {name}(x):\n    return " + _permutation_expression(table, in_width) + "\n"
+    namespace = {}
+    exec(source, namespace)
+    return namespace[name]
+
+
+def _compile_byte_permutation(name: str, table: List[int], in_width: int = 64):
+    """
+    Generuje permutację opartą na tablicach dla kolejnych bajtów wejścia.
+    
+    Dla każdego bajtu b wejścia i każdej jego wartości v tablica zawiera
+    wynik permutacji liczby z v na pozycji bajtu b. Permutacja całego
+    wejścia to OR odczytów z tablic (np. 8 zamiast 64 operacji na bitach).
+    
+    Args:
+        name: Nazwa generowanej funkcji
+        table: Tablica permutacji (numeracja od 1)
+        in_width: Szerokość wejścia w bitach (wielokrotność 8)
+        
+    Returns:
+        Tuple (funkcja int -> int, tablice np.uint64 o wymiarach (bajty, 256))
+    """
+    bit_permute = _compile_permutation(name, table, in_width)
+    shifts = range(in_width - 8, -1, -8)
+    
+    tables = [tuple(bit_permute(v << shift) for v in range(256)) for shift in shifts]
+    terms = [f"T{b}[(x >> {shift}) & 0xFF]" for b, shift in enumerate(shifts)]
+    
+    source = f"def {name}(x):\n    return " + " | ".join(terms) + "\n"
+    namespace = {f"T{b}": t for b, t in enumerate(tables)}
+    exec(source, namespace)
+    return namespace[name], np.array(tables, dtype=np.uint64)
+
+
+def byte_permute_np(x: np.ndarray, tables: np.ndarray) -> np.ndarray:
+    """Permutacja tablicy bloków (np.uint64) za pomocą tablic bajtowych."""
+    num_bytes = tables.shape[0]
+    output = np.zeros_like(x)
+    for b in range(num_bytes):
+        output |= tables[b][(x >> (8 * (num_bytes - 1 - b))) & 0xFF]
+    return output
+
+
+# Permutacje generowane przy imporcie modułu
+ip_permute, IP_BYTE_TABLES = _compile_byte_permutation("ip_permute", IP)
+fp_permute, FP_BYTE_TABLES = _compile_byte_permutation("fp_permute", FP)
+pc1_permute, PC1_BYTE_TABLES = _compile_byte_permutation("pc1_permute", PC1)
+expand_e = _compile_permutation("expand_e", E, 32)
+p_permute = _compile_permutation("p_permute", P, 32)
+pc2_permute = _compile_permutation("pc2_permute", PC2, 56)
+
+
+def rotate28(x: int, n: int) -> int:
+    """Rotacja cykliczna w lewo 28-bitowej połowy klucza o n pozycji."""
+    return ((x << n) | (x >> (28 - n))) & 0x0FFFFFFF
+
+
+# ============================================================================
+# TABLICE SP (S-BLOK + PERMUTACJA P)
+# ============================================================================
+
+# S_BOX_LOOKUP[i][v] = S_i(v) dla 6-bitowego wejścia v
+# (bity skrajne v wybierają wiersz, bity środkowe - kolumnę)
+S_BOX_LOOKUP = [
+    [sbox[((v >> 5) & 1) << 1 | (v & 1)][(v >> 1) & 0x0F] for v in range(64)]
+    for sbox in S_BOXES
+]
+
+# Ta sama tablica jako macierz NumPy (8 x 64) do obliczeń wektorowych
+S_BOX_FLAT = np.array(S_BOX_LOOKUP, dtype=np.uint8)
+
+# SP_BOXES[i][v] = P(S_i(v) umieszczone na bitach i-tego S-bloku)
+# Wynik funkcji Feistela to OR ośmiu odczytów z tych tablic.
+SP_BOXES = [
+    tuple(p_permute(S_BOX_LOOKUP[i][v] << (28 - 4 * i)) for v in range(64))
+    for i in range(8)
+]
+
+
+# Tablice SP jako macierz NumPy (8 x 64) dla szyfrowania wsadowego
+SP_BOXES_NP = np.array(SP_BOXES, dtype=np.uint32)
 
 
 # ============================================================================
@@ -212,26 +391,47 @@ def generate_subkeys(key: List[int]) -> List[List[int]]:
     Returns:
         Lista 16 podkluczy, każdy po 48 bitów
     """
+    return [int_to_bits(subkey, 48) for subkey in generate_subkeys_fast(bits_to_int(key))]
+
+
+@lru_cache(maxsize=256)
+def generate_subkeys_fast(key: int) -> Tuple[int, ...]:
+    """
+    Generuje 16 podkluczy jako 48-bitowe liczby całkowite.
+    
+    Wynik jest zapamiętywany dla ostatnio używanych kluczy, ponieważ ataki
+    szyfrują tysiące bloków tym samym kluczem.
+    
+    Args:
+        key: 64-bitowy klucz główny (liczba całkowita)
+        
+    Returns:
+        Krotka 16 podkluczy (48-bitowe liczby całkowite)
+    """
     # Permutacja PC-1: wybieramy 56 bitów z 64
-    key_56 = permute(key, PC1)
+    key_56 = pc1_permute(key)
     
     # Dzielimy na dwie połowy po 28 bitów
-    C = key_56[:28]
-    D = key_56[28:]
+    C = (key_56 >> 28) & 0x0FFFFFFF
+    D = key_56 & 0x0FFFFFFF
     
     subkeys = []
     
     for round_num in range(16):
         # Rotacja w lewo
-        C = left_rotate(C, ROTATIONS[round_num])
-        D = left_rotate(D, ROTATIONS[round_num])
+        C = rotate28(C, ROTATIONS[round_num])
+        D = rotate28(D, ROTATIONS[round_num])
         
         # Łączymy i stosujemy PC-2
-        CD = C + D
-        subkey = permute(CD, PC2)
-        subkeys.append(subkey)
+        subkeys.append(pc2_permute((C << 28) | D))
     
-    return subkeys
+    return tuple(subkeys)
+
+
+@lru_cache(maxsize=256)
+def _subkeys_cached(key: Tuple[int, ...]) -> Tuple[int, ...]:
+    """Podklucze (48-bitowe liczby) dla klucza w postaci krotki bitów."""
+    return generate_subkeys_fast(bits_to_int(key))
 
 
 # ============================================================================
@@ -248,23 +448,17 @@ def s_box_substitution(bits_48: List[int]) -> List[int]:
     Returns:
         32-bitowe wyjście po podstawieniu S-bloków
     """
-    output = []
+    return int_to_bits(_s_box_substitution_int(bits_to_int(bits_48)), 32)
+
+
+def _s_box_substitution_int(x: int) -> int:
+    """Podstawienie S-bloków na 48-bitowej liczbie całkowitej (-> 32 bity)."""
+    output = 0
     
     for i in range(8):
-        # Wycinamy 6 bitów dla i-tego S-bloku
-        block = bits_48[i * 6:(i + 1) * 6]
-        
-        # Bity skrajne (0 i 5) określają wiersz
-        row = (block[0] << 1) | block[5]
-        
-        # Bity środkowe (1-4) określają kolumnę
-        col = (block[1] << 3) | (block[2] << 2) | (block[3] << 1) | block[4]
-        
-        # Pobieramy wartość z S-bloku
-        val = S_BOXES[i][row][col]
-        
-        # Konwertujemy na 4 bity
-        output.extend(int_to_bits(val, 4))
+        # 6 bitów i-tego S-bloku: wiersz i kolumna są już uwzględnione
+        # w S_BOX_LOOKUP, wynik trafia na bity 28-4i..31-4i
+        output |= S_BOX_LOOKUP[i][(x >> (42 - 6 * i)) & 0x3F] << (28 - 4 * i)
     
     return output
 
@@ -281,66 +475,151 @@ def feistel_function(R: List[int], subkey: List[int]) -> List[int]:
         32-bitowy wynik funkcji Feistela
     """
     # 1. Rozszerzenie E: 32 -> 48 bitów
-    expanded = permute(R, E)
+    expanded = expand_e(bits_to_int(R))
     
     # 2. XOR z podkluczem
-    xored = xor(expanded, subkey)
+    xored = expanded ^ bits_to_int(subkey)
     
     # 3. Podstawienie S-bloków: 48 -> 32 bity
-    substituted = s_box_substitution(xored)
+    substituted = _s_box_substitution_int(xored)
     
     # 4. Permutacja P
-    output = permute(substituted, P)
+    return int_to_bits(p_permute(substituted), 32)
+
+
+def _feistel_int(R: int, subkey: int) -> int:
+    """
+    Funkcja Feistela f(R, K) na liczbach całkowitych (32 i 48 bitów).
     
-    return output
+    Podstawienie S-bloków i permutacja P są realizowane jednocześnie
+    przez tablice SP_BOXES.
+    """
+    x = expand_e(R) ^ subkey
+    return (SP_BOXES[0][(x >> 42) & 0x3F] | SP_BOXES[1][(x >> 36) & 0x3F] |
+            SP_BOXES[2][(x >> 30) & 0x3F] | SP_BOXES[3][(x >> 24) & 0x3F] |
+            SP_BOXES[4][(x >> 18) & 0x3F] | SP_BOXES[5][(x >> 12) & 0x3F] |
+            SP_BOXES[6][(x >> 6) & 0x3F] | SP_BOXES[7][x & 0x3F])
+
+
+def last_round_sbox_inputs(ciphertexts: np.ndarray) -> np.ndarray:
+    """
+    Oblicza wejścia S-bloków ostatniej rundy (przed XOR z kluczem) dla wielu szyfrogramów.
+    
+    IP wykonywane jest tablicami bajtowymi na wszystkich blokach naraz.
+    Rozszerzenia E nie trzeba składać: 6 bitów j-tego S-bloku to bity
+    od 4j 34-bitowej wartości R32 || R1..R32 || R1.
+    
+    Args:
+        ciphertexts: Szyfrogramy (np.uint64 lub lista liczb całkowitych)
+        
+    Returns:
+        Macierz uint8 o wymiarach (N, 8): [n][i] = 6 bitów E(R15) S-bloku i
+    """
+    blocks = byte_permute_np(np.asarray(ciphertexts, dtype=np.uint64), IP_BYTE_TABLES)
+    
+    # IP odwraca permutację końcową; R15 = L16 to młodsze 32 bity bloku
+    R15 = blocks & np.uint64(0xFFFFFFFF)
+    wrapped = ((R15 & np.uint64(1)) << np.uint64(33)) | (R15 << np.uint64(1)) | (R15 >> np.uint64(31))
+    shifts = np.arange(28, -1, -4, dtype=np.uint64)
+    return ((wrapped[:, None] >> shifts) & np.uint64(0x3F)).astype(np.uint8)
 
 
 # ============================================================================
 # SZYFROWANIE / DESZYFROWANIE DES
 # ============================================================================
 
-def des_encrypt_block(plaintext: List[int], key: List[int]) -> List[int]:
+def _des_rounds_int(block: int, subkeys: Sequence[int]) -> Tuple[int, int, int]:
     """
-    Szyfruje pojedynczy 64-bitowy blok algorytmem DES.
+    Rdzeń DES na liczbach całkowitych: IP, rundy Feistela, FP.
     
     Args:
-        plaintext: 64-bitowy tekst jawny
-        key: 64-bitowy klucz
+        block: 64-bitowy blok wejściowy
+        subkeys: Podklucze (48-bitowe) w kolejności użycia w rundach
         
     Returns:
-        64-bitowy szyfrogram
+        Tuple (blok_wyjściowy, L_final, R_final)
     """
-    # Generujemy podklucze
-    subkeys = generate_subkeys(key)
-    
     # Permutacja początkowa
-    permuted = permute(plaintext, IP)
+    permuted = ip_permute(block)
     
-    # Dzielimy na lewą i prawą połowę
-    L = permuted[:32]
-    R = permuted[32:]
+    # Dzielimy na lewą i prawą połowę (po 32 bity)
+    L = permuted >> 32
+    R = permuted & 0xFFFFFFFF
     
-    # 16 rund Feistela
-    for i in range(16):
-        # Zapisujemy starą prawą połowę
-        old_R = R.copy()
+    for subkey in subkeys:
+        # Nowa lewa połowa = stara prawa, nowa prawa = L XOR f(R, K_i)
+        L, R = R, L ^ _feistel_int(R, subkey)
+    
+    # Po ostatniej rundzie łączymy R + L (zamiana!) i stosujemy FP
+    return fp_permute((R << 32) | L), L, R
+
+
+def des_encrypt_with_subkeys(plaintext: int, subkeys: Sequence[int]) -> int:
+    """
+    Szyfruje 64-bitowy blok (liczba całkowita) gotowymi podkluczami.
+    
+    Pozwala pominąć generowanie podkluczy w pętlach szyfrujących wiele
+    bloków tym samym kluczem. Liczba rund równa się liczbie podkluczy.
+    
+    Args:
+        plaintext: 64-bitowy tekst jawny
+        subkeys: Podklucze, np. generate_subkeys_fast(key)[:num_rounds]
         
-        # Obliczamy f(R, K_i)
-        f_result = feistel_function(R, subkeys[i])
+    Returns:
+        64-bitowy szyfrogram
+    """
+    ciphertext, _, _ = _des_rounds_int(plaintext, subkeys)
+    return ciphertext
+
+
+def des_encrypt_int(plaintext: int, key: int) -> int:
+    """
+    Szyfruje 64-bitowy blok algorytmem DES (liczby całkowite).
+    
+    Args:
+        plaintext: 64-bitowy tekst jawny
+        key: 64-bitowy klucz
         
-        # Nowa prawa połowa = L XOR f(R, K_i)
-        R = xor(L, f_result)
+    Returns:
+        64-bitowy szyfrogram
+    """
+    ciphertext, _, _ = _des_rounds_int(plaintext, generate_subkeys_fast(key))
+    return ciphertext
+
+
+def des_decrypt_int(ciphertext: int, key: int) -> int:
+    """
+    Deszyfruje 64-bitowy blok algorytmem DES (liczby całkowite).
+    
+    Args:
+        ciphertext: 64-bitowy szyfrogram
+        key: 64-bitowy klucz
         
-        # Nowa lewa połowa = stara prawa połowa
-        L = old_R
+    Returns:
+        64-bitowy tekst jawny
+    """
+    plaintext, _, _ = _des_rounds_int(ciphertext, generate_subkeys_fast(key)[::-1])
+    return plaintext
+
+
+def des_encrypt_block(plaintext: List[int], key: List[int]) -> List[int]:
+    """
+    Szyfruje pojedynczy 64-bitowy blok algorytmem DES.
     
-    # Po ostatniej rundzie łączymy R + L (zamiana!)
-    combined = R + L
+    Args:
+        plaintext: 64-bitowy tekst jawny
+        key: 64-bitowy klucz
+        
+    Returns:
+        64-bitowy szyfrogram
+    """
+    # Generujemy podklucze
+    subkeys = _subkeys_cached(tuple(key))
     
-    # Permutacja końcowa
-    ciphertext = permute(combined, FP)
+    # 16 rund Feistela na spakowanym stanie
+    ciphertext, _, _ = _des_rounds_int(bits_to_int(plaintext), subkeys)
     
-    return ciphertext
+    return int_to_bits(ciphertext, 64)
 
 
 def des_decrypt_block(ciphertext: List[int], key: List[int]) -> List[int]:
@@ -355,29 +634,12 @@ def des_decrypt_block(ciphertext: List[int], key: List[int]) -> List[int]:
         64-bitowy tekst jawny
     """
     # Generujemy podklucze
-    subkeys = generate_subkeys(key)
-    
-    # Permutacja początkowa
-    permuted = permute(ciphertext, IP)
-    
-    # Dzielimy na lewą i prawą połowę
-    L = permuted[:32]
-    R = permuted[32:]
+    subkeys = _subkeys_cached(tuple(key))
     
     # 16 rund Feistela z odwróconą kolejnością podkluczy
-    for i in range(15, -1, -1):
-        old_R = R.copy()
-        f_result = feistel_function(R, subkeys[i])
-        R = xor(L, f_result)
-        L = old_R
-    
-    # Łączymy R + L
-    combined = R + L
+    plaintext, _, _ = _des_rounds_int(bits_to_int(ciphertext), subkeys[::-1])
     
-    # Permutacja końcowa
-    plaintext = permute(combined, FP)
-    
-    return plaintext
+    return int_to_bits(plaintext, 64)
 
 
 def des_encrypt_block_rounds(plaintext: List[int], key: List[int], num_rounds: int = 16) -> Tuple[List[int], List[int], List[int]]:
@@ -392,22 +654,351 @@ def des_encrypt_block_rounds(plaintext: List[int], key: List[int], num_rounds: i
     Returns:
         Tuple (ciphertext, L_final, R_final)
     """
-    subkeys = generate_subkeys(key)
-    permuted = permute(plaintext, IP)
+    subkeys = _subkeys_cached(tuple(key))
+    ciphertext, L, R = _des_rounds_int(bits_to_int(plaintext), subkeys[:num_rounds])
+    
+    return int_to_bits(ciphertext, 64), int_to_bits(L, 32), int_to_bits(R, 32)
+
+
+def _feistel_np(R: np.ndarray, subkey: int) -> np.ndarray:
+    """Funkcja Feistela dla tablicy 32-bitowych połówek (np.uint64)."""
+    x = expand_e(R) ^ subkey
+    return (SP_BOXES_NP[0][(x >> 42) & 0x3F] | SP_BOXES_NP[1][(x >> 36) & 0x3F] |
+            SP_BOXES_NP[2][(x >> 30) & 0x3F] | SP_BOXES_NP[3][(x >> 24) & 0x3F] |
+            SP_BOXES_NP[4][(x >> 18) & 0x3F] | SP_BOXES_NP[5][(x >> 12) & 0x3F] |
+            SP_BOXES_NP[6][(x >> 6) & 0x3F] | SP_BOXES_NP[7][x & 0x3F])
+
+
+def des_encrypt_many(plaintexts: np.ndarray, key: int, num_rounds: int = 16) -> np.ndarray:
+    """
+    Szyfruje tablicę 64-bitowych bloków wspólnym kluczem.
+    
+    Podklucze liczone są raz, a każda operacja rundy (permutacje
+    z przesunięć i masek, odczyty tablic SP) wykonywana jest przez NumPy
+    na wszystkich blokach jednocześnie.
+    
+    Args:
+        plaintexts: Tablica bloków tekstu jawnego (np.uint64)
+        key: 64-bitowy klucz (liczba całkowita)
+        num_rounds: Liczba rund (domyślnie 16)
+        
+    Returns:
+        Tablica szyfrogramów (np.uint64) w kolejności wejścia
+    """
+    subkeys = generate_subkeys_fast(key)[:num_rounds]
+    
+    permuted = byte_permute_np(np.asarray(plaintexts, dtype=np.uint64), IP_BYTE_TABLES)
+    L = permuted >> 32
+    R = permuted & 0xFFFFFFFF
+    
+    for subkey in subkeys:
+        L, R = R, L ^ _feistel_np(R, subkey)
+    
+    return byte_permute_np((R << 32) | L, FP_BYTE_TABLES)
+
+
+def make_batch_oracle(key: int, num_rounds: int = 16):
+    """
+    Tworzy wsadowe oracle szyfrujące tablicę bloków ukrytym kluczem.
+    
+    Args:
+        key: 64-bitowy klucz (liczba całkowita)
+        num_rounds: Liczba rund (domyślnie 16)
+        
+    Returns:
+        Funkcja oracle_batch(plaintexts: np.ndarray) -> np.ndarray
+    """
+    def oracle_batch(plaintexts: np.ndarray) -> np.ndarray:
+        return des_encrypt_many(plaintexts, key, num_rounds)
+    
+    return oracle_batch
+
+
+def make_des_oracle(key: int, num_rounds: int = 16):
+    """
+    Generuje funkcję szyfrującą wyspecjalizowaną dla stałego klucza.
+    
+    Kod 16 (num_rounds) rund jest tworzony przez exec jako ciąg instrukcji
+    bez pętli: podklucze są wpisane jako stałe, a rozszerzenie E jako
+    wyrażenie z przesunięć i masek, więc szyfrowanie nie odwołuje się
+    do tablicy podkluczy ani do funkcji Feistela.
+    
+    Args:
+        key: 64-bitowy klucz (liczba całkowita)
+        num_rounds: Liczba rund (domyślnie 16)
+        
+    Returns:
+        Funkcja oracle(plaintext: int) -> int
+    """
+    subkeys = generate_subkeys_fast(key)[:num_rounds]
+    expand = _permutation_expression(E, 32, "R")
+    
+    lines = [
+        "def oracle(plaintext):",
+        "    permuted = ip_permute(plaintext)",
+        "    L = permuted >> 32",
+        "    R = permuted & 0xFFFFFFFF",
+    ]
+    for subkey in subkeys:
+        lines.append(f"    x = ({expand}) ^ 0x{subkey:012X}")
+        lines.append("    L, R = R, L ^ (SP0[(x >> 42) & 0x3F] | SP1[(x >> 36) & 0x3F] | "
+                     "SP2[(x >> 30) & 0x3F] | SP3[(x >> 24) & 0x3F] | "
+                     "SP4[(x >> 18) & 0x3F] | SP5[(x >> 12) & 0x3F] | "
+                     "SP6[(x >> 6) & 0x3F] | SP7[x & 0x3F])")
+    lines.append("    return fp_permute((R << 32) | L)")
+    
+    namespace = {f"SP{i}": SP_BOXES[i] for i in range(8)}
+    namespace.update(ip_permute=ip_permute, fp_permute=fp_permute)
+    exec("\n".join(lines) + "\n", namespace)
+    return namespace["oracle"]
+
+
+# ============================================================================
+# DES BITSLICE (WIELE BLOKÓW JEDNOCZEŚNIE)
+# ============================================================================
+#
+# W reprezentacji bitslice i-ty element listy to liczba całkowita, której
+# bit j jest i-tym bitem j-tego bloku. Każda operacja logiczna przetwarza
+# więc wszystkie bloki naraz, a permutacje sprowadzają się do zmiany
+# kolejności elementów listy.
+
+def _compile_sbox_circuit(name: str, sbox_index: int):
+    """
+    Generuje obwód logiczny (AND/XOR) S-bloku dla reprezentacji bitslice.
+    
+    Obwód wynika z algebraicznej postaci normalnej (ANF) każdego z 4 bitów
+    wyjścia: wspólne jednomiany wejść są liczone raz, a bity wyjścia są
+    sumą XOR odpowiednich jednomianów.
+    
+    Args:
+        name: Nazwa generowanej funkcji
+        sbox_index: Indeks S-bloku (0-7)
+        
+    Returns:
+        Funkcja (a0, ..., a5, ones) -> (o0, o1, o2, o3)
+    """
+    anf = []
+    for bit in range(4):
+        # Tablica prawdy bitu wyjścia i transformata Möbiusa -> ANF
+        coeffs = [(S_BOX_LOOKUP[sbox_index][v] >> (3 - bit)) & 1 for v in range(64)]
+        for var in range(6):
+            for v in range(64):
+                if v & (1 << var):
+                    coeffs[v] ^= coeffs[v ^ (1 << var)]
+        anf.append([m for m in range(64) if coeffs[m]])
+    
+    # Jednomian m (maska 6 bitów, bit 5 = a0) liczony przyrostowo
+    lines = [f"def {name}(a0, a1, a2, a3, a4, a5, ones):"]
+    needed = sorted({m for terms in anf for m in terms if m}, key=lambda m: bin(m).count("1"))
+    defined = set()
+    
+    def define(m):
+        if m in defined or bin(m).count("1") == 1:
+            return
+        high = m.bit_length() - 1
+        rest = m ^ (1 << high)
+        define(rest)
+        lines.append(f"    m{m} = {_monomial(rest)} & a{5 - high}")
+        defined.add(m)
+    
+    for m in needed:
+        define(m)
+    
+    outputs = []
+    for terms in anf:
+        expr = " ^ ".join("ones" if m == 0 else _monomial(m) for m in terms)
+        outputs.append(expr or "0")
+    lines.append("    return (" + ", ".join(outputs) + ")")
+    
+    namespace = {}
+    exec("\n".join(lines) + "\n", namespace)
+    return namespace[name]
+
+
+def _monomial(m: int) -> str:
+    """Nazwa zmiennej jednomianu m w generowanym obwodzie S-bloku."""
+    if bin(m).count("1") == 1:
+        return f"a{5 - (m.bit_length() - 1)}"
+    return f"m{m}"
+
+
+SBOX_CIRCUITS = [_compile_sbox_circuit(f"sbox{i + 1}_bitslice", i) for i in range(8)]
+
+
+def bitslice_pack(blocks: List[int]) -> List[int]:
+    """
+    Transponuje listę 64-bitowych bloków do 64 plastrów bitslice.
+    
+    Args:
+        blocks: Lista bloków (liczby całkowite)
+        
+    Returns:
+        Lista 64 liczb; bit j elementu i to i-ty bit (od najstarszego) bloku j
+    """
+    packed = np.packbits(blocks_to_bits_array(blocks).T, axis=1, bitorder='little')
+    return [int.from_bytes(row.tobytes(), 'little') for row in packed]
+
+
+def bitslice_unpack(slices: List[int], num_blocks: int) -> List[int]:
+    """
+    Transpozycja odwrotna do bitslice_pack.
     
+    Args:
+        slices: Lista 64 plastrów
+        num_blocks: Liczba bloków zapisanych w plastrach
+        
+    Returns:
+        Lista 64-bitowych bloków
+    """
+    num_bytes = (num_blocks + 7) // 8
+    rows = np.frombuffer(b''.join(s.to_bytes(num_bytes, 'little') for s in slices), dtype=np.uint8)
+    bits = np.unpackbits(rows.reshape(64, num_bytes), axis=1, bitorder='little')[:, :num_blocks]
+    return bits_array_to_blocks(bits.T).tolist()
+
+
+def des_encrypt_bitslice(p_bits: List[int], k_bits: List[int], lanes: int = 64, num_rounds: int = 16) -> List[int]:
+    """
+    Szyfruje równolegle wiele bloków DES w reprezentacji bitslice.
+    
+    Args:
+        p_bits: 64 plastry tekstów jawnych (p_bits[i] - i-ty bit wszystkich bloków)
+        k_bits: 64 plastry klucza (dla wspólnego klucza: 0 lub same jedynki)
+        lanes: Liczba bloków przetwarzanych równolegle (szerokość plastra)
+        num_rounds: Liczba rund (domyślnie 16)
+        
+    Returns:
+        64 plastry szyfrogramów
+    """
+    ones = (1 << lanes) - 1
+    
+    # Permutacja początkowa - tylko zmiana kolejności plastrów
+    permuted = [p_bits[i - 1] for i in IP]
     L = permuted[:32]
     R = permuted[32:]
     
-    for i in range(num_rounds):
-        old_R = R.copy()
-        f_result = feistel_function(R, subkeys[i])
-        R = xor(L, f_result)
-        L = old_R
+    # Podklucze: PC-1, rotacje i PC-2 również są zmianą kolejności
+    key_56 = [k_bits[i - 1] for i in PC1]
+    C = key_56[:28]
+    D = key_56[28:]
     
+    for round_num in range(num_rounds):
+        C = left_rotate(C, ROTATIONS[round_num])
+        D = left_rotate(D, ROTATIONS[round_num])
+        CD = C + D
+        
+        # Rozszerzenie E i XOR z podkluczem
+        x = [R[e - 1] ^ CD[k - 1] for e, k in zip(E, PC2)]
+        
+        # S-bloki jako obwody logiczne
+        substituted = []
+        for i in range(8):
+            substituted.extend(SBOX_CIRCUITS[i](*x[6 * i:6 * i + 6], ones))
+        
+        # Permutacja P i XOR z lewą połową
+        L, R = R, [l ^ substituted[p - 1] for l, p in zip(L, P)]
+    
+    # Zamiana połówek i permutacja końcowa
     combined = R + L
-    ciphertext = permute(combined, FP)
+    return [combined[i - 1] for i in FP]
+
+
+def des_encrypt_blocks_bitslice(blocks: List[int], key: int, num_rounds: int = 16,
+                                lanes: Optional[int] = None) -> List[int]:
+    """
+    Szyfruje listę 64-bitowych bloków wspólnym kluczem (bitslice).
+    
+    Args:
+        blocks: Bloki tekstu jawnego (liczby całkowite)
+        key: 64-bitowy klucz (liczba całkowita)
+        num_rounds: Liczba rund (domyślnie 16)
+        lanes: Liczba bloków w jednej partii bitslice (domyślnie wszystkie;
+               liczby całkowite Pythona mają dowolną szerokość)
+        
+    Returns:
+        Lista szyfrogramów (liczby całkowite) w kolejności wejścia
+    """
+    if lanes is None:
+        lanes = max(len(blocks), 1)
+    
+    ciphertexts = []
+    
+    for start in range(0, len(blocks), lanes):
+        batch = blocks[start:start + lanes]
+        ones = (1 << len(batch)) - 1
+        k_bits = [ones if (key >> (63 - i)) & 1 else 0 for i in range(64)]
+        c_bits = des_encrypt_bitslice(bitslice_pack(batch), k_bits, len(batch), num_rounds)
+        ciphertexts.extend(bitslice_unpack(c_bits, len(batch)))
+    
+    return ciphertexts
+
+
+# ============================================================================
+# TABLICE ZAPISYWANE NA DYSKU
+# ============================================================================
+
+# Katalog plików .npy z tablicami zależnymi tylko od stałych DES (LAT, DDT)
+TABLE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.table_cache')
+
+# Wersja formatu plików; zmiana unieważnia wszystkie zapisane tablice
+TABLE_CACHE_FORMAT = 1
+
+
+def _table_digest(name: str, shape: Tuple[int, ...], dtype: np.dtype, version: int) -> str:
+    """Skrót danych wejściowych tablicy: S-bloki, kształt, typ i wersje kodu."""
+    digest = hashlib.sha256()
+    digest.update(repr((TABLE_CACHE_FORMAT, name, version, shape, dtype.str)).encode())
+    digest.update(np.array(S_BOXES, dtype=np.uint8).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def load_or_compute_table(name: str, shape: Tuple[int, ...], dtype,
+                          compute: Callable[[], np.ndarray], version: int = 1) -> np.ndarray:
+    """
+    Wczytuje tablicę z pliku .npy (np.load z mmap) lub oblicza ją i zapisuje.
+    
+    Nazwa pliku zawiera skrót S-bloków, kształtu, typu oraz wersji kodu
+    liczącego tablicę, więc zmiana którejkolwiek z nich daje nowy plik
+    zamiast wczytania nieaktualnego. Plik o innym kształcie lub typie
+    jest odrzucany, a brak prawa zapisu tylko wyłącza zapis.
+    
+    Args:
+        name: Nazwa tablicy (przedrostek nazwy pliku w TABLE_CACHE_DIR)
+        shape: Oczekiwany kształt tablicy
+        dtype: Oczekiwany typ elementów
+        compute: Funkcja obliczająca tablicę
+        version: Wersja kodu compute (zwiększana przy każdej zmianie wyniku)
+        
+    Returns:
+        Tablica tylko do odczytu
+    """
+    dtype = np.dtype(dtype)
+    path = os.path.join(TABLE_CACHE_DIR,
+                        f"{name}-{_table_digest(name, shape, dtype, version)}.npy")
+    
+    try:
+        table = np.load(path, mmap_mode='r')
+        if table.shape == shape and table.dtype == dtype:
+            return table
+    except (OSError, ValueError):
+        pass
+    
+    table = np.asarray(compute())
+    if table.shape != shape or table.dtype != dtype:
+        raise ValueError(f"Tablica {name}: oczekiwano {shape} {dtype}, "
+                         f"otrzymano {table.shape} {table.dtype}")
+    table.setflags(write=False)
+    
+    try:
+        os.makedirs(TABLE_CACHE_DIR, exist_ok=True)
+        # Zapis do pliku tymczasowego i podmiana - bez częściowo zapisanych plików
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.save(f, table)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
     
-    return ciphertext, L, R
+    return table
 
 
 # ============================================================================
@@ -425,10 +1016,7 @@ def encrypt(plaintext_hex: str, key_hex: str) -> str:
     Returns:
         Szyfrogram w formacie hex
     """
-    plaintext_bits = hex_to_bits(plaintext_hex)
-    key_bits = hex_to_bits(key_hex)
-    ciphertext_bits = des_encrypt_block(plaintext_bits, key_bits)
-    return bits_to_hex(ciphertext_bits)
+    return int_to_hex(des_encrypt_int(hex_to_int(plaintext_hex), hex_to_int(key_hex)))
 
 
 def decrypt(ciphertext_hex: str, key_hex: str) -> str:
@@ -442,10 +1030,7 @@ def decrypt(ciphertext_hex: str, key_hex: str) -> str:
     Returns:
         Tekst jawny w formacie hex
     """
-    ciphertext_bits = hex_to_bits(ciphertext_hex)
-    key_bits = hex_to_bits(key_hex)
-    plaintext_bits = des_decrypt_block(ciphertext_bits, key_bits)
-    return bits_to_hex(plaintext_bits)
+    return int_to_hex(des_decrypt_int(hex_to_int(ciphertext_hex), hex_to_int(key_hex)))
 
 
 # ============================================================================
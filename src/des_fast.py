@@ -0,0 +1,245 @@
+"""
+Szybki rdzeń DES kompilowany przez Numba (opcjonalnie)
+Rundy Feistela na rejestrach 32-bitowych z tablicami SP
+
+Jeśli pakiet numba nie jest zainstalowany, funkcje modułu korzystają
+z implementacji w czystym Pythonie z modułu des.
+
+Autorzy: Projekt KRYS - Kryptografia Stosowana
+"""
+
+import os
+import numpy as np
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from des import (
+    SP_BOXES_NP, IP_BYTE_TABLES, FP_BYTE_TABLES, ip_permute, fp_permute,
+    generate_subkeys_fast, des_encrypt_with_subkeys, des_encrypt_many
+)
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, modes
+    try:
+        from cryptography.hazmat.decrepit.ciphers.algorithms import TripleDES
+    except ImportError:
+        # cryptography < 43
+        from cryptography.hazmat.primitives.ciphers.algorithms import TripleDES
+except ImportError:
+    Cipher = None
+
+
+# Czy dostępny jest kompilator Numba
+HAVE_NUMBA = njit is not None
+
+# Czy dostępny jest DES z OpenSSL (pakiet cryptography)
+HAVE_OPENSSL = Cipher is not None
+
+# Tablice SP (8 x 64) przekazywane do skompilowanego rdzenia
+SP = SP_BOXES_NP
+
+# Minimalna liczba bloków, od której opłaca się szyfrowanie równoległe
+# (jądro Numba lub pula procesów); mniejsze tablice szyfruje des.des_encrypt_many,
+# bo samo załadowanie skompilowanego jądra trwa ~0.2 s
+PARALLEL_MIN_BLOCKS = 1 << 16
+
+
+# ============================================================================
+# RDZEŃ DES
+# ============================================================================
+
+def _des_core(L, R, subkeys, sp):
+    """
+    Rundy Feistela DES na połówkach po permutacji początkowej.
+    
+    Rozszerzenie E liczone jest bezpośrednio z 34-bitowej wartości
+    R32 || R1..R32 || R1: 6 bitów j-tego S-bloku to jej bity od 4j.
+    
+    Args:
+        L: Lewa połowa (32 bity)
+        R: Prawa połowa (32 bity)
+        subkeys: Podklucze (int64[num_rounds], po 48 bitów)
+        sp: Tablice SP (uint32[8, 64])
+        
+    Returns:
+        64-bitowy blok R || L przed permutacją końcową (uint64)
+    """
+    L = np.int64(L)
+    R = np.int64(R)
+    
+    for r in range(subkeys.shape[0]):
+        k = subkeys[r]
+        x = ((R & 1) << 33) | (R << 1) | (R >> 31)
+        t = np.int64(0)
+        for j in range(8):
+            t |= sp[j, ((x >> (28 - 4 * j)) ^ (k >> (42 - 6 * j))) & 0x3F]
+        L, R = R, L ^ t
+        
+    return (np.uint64(R) << np.uint64(32)) | np.uint64(L)
+
+
+def _byte_permute(x, tables):
+    """Permutacja 64-bitowego bloku (uint64) za pomocą tablic bajtowych."""
+    output = np.uint64(0)
+    for b in range(8):
+        output |= tables[b, (x >> np.uint64(56 - 8 * b)) & np.uint64(0xFF)]
+    return output
+
+
+def _des_encrypt_many_kernel(plaintexts, subkeys, sp, ip_tables, fp_tables):
+    """
+    Szyfruje tablicę bloków; iteracje pętli są niezależne (prange).
+    
+    Args:
+        plaintexts: Bloki tekstu jawnego (uint64[N])
+        subkeys: Podklucze (int64[num_rounds])
+        sp: Tablice SP (uint32[8, 64])
+        ip_tables: Tablice bajtowe IP (uint64[8, 256])
+        fp_tables: Tablice bajtowe FP (uint64[8, 256])
+        
+    Returns:
+        Szyfrogramy (uint64[N])
+    """
+    ciphertexts = np.empty_like(plaintexts)
+    
+    for i in prange(plaintexts.shape[0]):
+        permuted = _byte_permute(plaintexts[i], ip_tables)
+        combined = _des_core(permuted >> np.uint64(32), permuted & np.uint64(0xFFFFFFFF),
+                             subkeys, sp)
+        ciphertexts[i] = _byte_permute(combined, fp_tables)
+    
+    return ciphertexts
+
+
+if HAVE_NUMBA:
+    _des_core = njit(cache=True, inline='always')(_des_core)
+    _byte_permute = njit(cache=True, inline='always')(_byte_permute)
+    _des_encrypt_many_kernel = njit(cache=True, parallel=True)(_des_encrypt_many_kernel)
+
+
+@lru_cache(maxsize=256)
+def _subkeys_array(key: int, num_rounds: int) -> np.ndarray:
+    """Podklucze klucza jako tablica int64 dla skompilowanego rdzenia."""
+    return np.array(generate_subkeys_fast(key)[:num_rounds], dtype=np.int64)
+
+
+# ============================================================================
+# FUNKCJE SZYFRUJĄCE
+# ============================================================================
+
+def des_encrypt_block_fast(plaintext: int, key: int, num_rounds: int = 16) -> int:
+    """
+    Szyfruje 64-bitowy blok (liczba całkowita) skompilowanym rdzeniem DES.
+    
+    Permutacje IP i FP wykonywane są raz, na granicy wywołania. Bez Numba
+    używana jest implementacja des.des_encrypt_with_subkeys.
+    
+    Args:
+        plaintext: 64-bitowy tekst jawny
+        key: 64-bitowy klucz
+        num_rounds: Liczba rund (domyślnie 16)
+        
+    Returns:
+        64-bitowy szyfrogram
+    """
+    if not HAVE_NUMBA:
+        return des_encrypt_with_subkeys(plaintext, generate_subkeys_fast(key)[:num_rounds])
+        
+    permuted = ip_permute(plaintext)
+    combined = _des_core(permuted >> 32, permuted & 0xFFFFFFFF,
+                         _subkeys_array(key, num_rounds), SP)
+    return fp_permute(int(combined))
+
+
+def des_encrypt_many_fast(plaintexts: np.ndarray, key: int, num_rounds: int = 16,
+                          workers: Optional[int] = None) -> np.ndarray:
+    """
+    Szyfruje tablicę bloków wspólnym kluczem, równolegle na wielu rdzeniach.
+    
+    Tablice mniejsze niż PARALLEL_MIN_BLOCKS szyfrowane są bezpośrednio przez
+    des.des_encrypt_many (ładowanie jądra i start puli są kosztowne). Większe
+    z Numba szyfruje pętla kompilowana z numba.prange, a bez Numba - pula
+    procesów, każdy z częścią tablicy.
+    
+    Args:
+        plaintexts: Tablica bloków tekstu jawnego (np.uint64)
+        key: 64-bitowy klucz (liczba całkowita)
+        num_rounds: Liczba rund (domyślnie 16)
+        workers: Liczba procesów puli (domyślnie liczba rdzeni)
+        
+    Returns:
+        Tablica szyfrogramów (np.uint64) w kolejności wejścia
+    """
+    plaintexts = np.ascontiguousarray(plaintexts, dtype=np.uint64)
+    
+    if plaintexts.size < PARALLEL_MIN_BLOCKS:
+        return des_encrypt_many(plaintexts, key, num_rounds)
+    
+    if HAVE_NUMBA:
+        return _des_encrypt_many_kernel(plaintexts, _subkeys_array(key, num_rounds), SP,
+                                        IP_BYTE_TABLES, FP_BYTE_TABLES)
+    
+    workers = workers or os.cpu_count() or 1
+    chunks = np.array_split(plaintexts, workers)
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(des_encrypt_many, chunks,
+                           [key] * workers, [num_rounds] * workers)
+        return np.concatenate(list(results))
+
+
+# ============================================================================
+# ORACLE WSADOWE
+# ============================================================================
+
+def make_openssl_batch_oracle(key: int):
+    """
+    Tworzy wsadowe oracle pełnego 16-rundowego DES oparte na OpenSSL.
+    
+    DES realizowany jest jako TripleDES z kluczem K || K || K, co daje
+    pojedynczy DES. Wszystkie bloki szyfrowane są jednym wywołaniem ECB.
+    
+    Args:
+        key: 64-bitowy klucz (liczba całkowita)
+        
+    Returns:
+        Funkcja oracle_batch(plaintexts: np.ndarray) -> np.ndarray
+    """
+    if not HAVE_OPENSSL:
+        raise RuntimeError("Oracle OpenSSL wymaga pakietu cryptography")
+    
+    key_bytes = key.to_bytes(8, 'big') * 3
+    
+    def oracle_batch(plaintexts: np.ndarray) -> np.ndarray:
+        encryptor = Cipher(TripleDES(key_bytes), modes.ECB()).encryptor()
+        data = np.asarray(plaintexts, dtype=np.uint64).astype('>u8').tobytes()
+        ciphertext = encryptor.update(data) + encryptor.finalize()
+        return np.frombuffer(ciphertext, dtype='>u8').astype(np.uint64)
+    
+    return oracle_batch
+
+
+def make_batch_oracle_fast(key: int, num_rounds: int = 16):
+    """
+    Wybiera najszybsze dostępne wsadowe oracle DES.
+    
+    Pełny 16-rundowy DES szyfrowany jest przez OpenSSL (jeśli dostępny),
+    zredukowane wersje - przez des_encrypt_many_fast (równolegle dla co
+    najmniej PARALLEL_MIN_BLOCKS bloków: jądrem Numba lub pulą procesów).
+    
+    Args:
+        key: 64-bitowy klucz (liczba całkowita)
+        num_rounds: Liczba rund (domyślnie 16)
+        
+    Returns:
+        Funkcja oracle_batch(plaintexts: np.ndarray) -> np.ndarray
+    """
+    if num_rounds == 16 and HAVE_OPENSSL:
+        return make_openssl_batch_oracle(key)
+    return lambda plaintexts: des_encrypt_many_fast(plaintexts, key, num_rounds)
@@ -6,14 +6,18 @@ Autorzy: Projekt KRYS - Kryptografia Stosowana
 """
 
 import numpy as np
+from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import List, Dict, Tuple, Optional
-from collections import defaultdict
 from des import (
-    S_BOXES, E, P, IP, FP,
-    hex_to_bits, bits_to_hex, bits_to_int, int_to_bits,
-    permute, xor, generate_subkeys, feistel_function,
-    s_box_substitution, des_encrypt_block, des_encrypt_block_rounds
+    S_BOXES, S_BOX_LOOKUP, S_BOX_FLAT, E, P, IP, FP,
+    ip_permute, expand_e, hex_to_bits, bits_to_hex, bits_to_int, int_to_bits,
+    blocks_to_bits_array, bits_array_to_blocks, last_round_sbox_inputs,
+    permute, generate_subkeys, feistel_function,
+    s_box_substitution, des_encrypt_block, make_des_oracle,
+    make_batch_oracle, load_or_compute_table
 )
+from compat import DATACLASS_SLOTS
 
 
 # ============================================================================
@@ -34,47 +38,47 @@ def compute_ddt(sbox: List[List[int]]) -> np.ndarray:
     Returns:
         Macierz DDT o wymiarach 64x16
     """
+    # Wartości S-bloku dla wszystkich 64 wejść
+    # Wiersz: bity 0 i 5 (skrajne), kolumna: bity 1-4
+    x = np.arange(64)
+    rows = ((x >> 5) & 1) << 1 | (x & 1)
+    cols = (x >> 1) & 0x0F
+    sbox_flat = np.asarray(sbox)[rows, cols]
+    
+    # delta_y[delta_x][x] = S(x) XOR S(x XOR delta_x)
+    delta_x = x[:, None]
+    delta_y = sbox_flat[x[None, :]] ^ sbox_flat[x[None, :] ^ delta_x]
+    
+    # Zliczamy pary dla każdej kombinacji (delta_x, delta_y)
     ddt = np.zeros((64, 16), dtype=int)
-    
-    # Dla każdej możliwej wartości wejściowej x (0-63)
-    for x in range(64):
-        # Dla każdej możliwej różnicy wejściowej delta_x (0-63)
-        for delta_x in range(64):
-            # Obliczamy x' = x XOR delta_x
-            x_prime = x ^ delta_x
-            
-            # Obliczamy wartości S-bloku
-            # Wiersz: bity 0 i 5 (skrajne)
-            row_x = ((x >> 5) & 1) << 1 | (x & 1)
-            col_x = (x >> 1) & 0x0F
-            
-            row_x_prime = ((x_prime >> 5) & 1) << 1 | (x_prime & 1)
-            col_x_prime = (x_prime >> 1) & 0x0F
-            
-            y = sbox[row_x][col_x]
-            y_prime = sbox[row_x_prime][col_x_prime]
-            
-            # Różnica wyjściowa
-            delta_y = y ^ y_prime
-            
-            # Zwiększamy licznik
-            ddt[delta_x][delta_y] += 1
+    np.add.at(ddt, (np.broadcast_to(delta_x, delta_y.shape), delta_y), 1)
     
     return ddt
 
 
+@lru_cache(maxsize=None)
+def _all_ddts() -> Tuple[np.ndarray, ...]:
+    """Tablice DDT wszystkich S-bloków (tylko do odczytu), zapisywane na dysku."""
+    tables = load_or_compute_table(
+        "des_ddts", (8, 64, 16), int,
+        lambda: np.stack([compute_ddt(sbox) for sbox in S_BOXES]),
+        version=1  # zwiększyć po każdej zmianie wyniku compute_ddt
+    )
+    return tuple(tables)
+
+
 def compute_all_ddts() -> List[np.ndarray]:
     """
     Oblicza tablice DDT dla wszystkich 8 S-bloków DES.
     
+    Wynik zapamiętywany jest przy pierwszym wywołaniu: DifferentialAttack
+    i demonstrate_ddt korzystają z tych samych macierzy (tylko do odczytu).
+    Kolejne uruchomienia wczytują je z pliku (des.load_or_compute_table).
+    
     Returns:
         Lista 8 macierzy DDT
     """
-    ddts = []
-    for i, sbox in enumerate(S_BOXES):
-        ddt = compute_ddt(sbox)
-        ddts.append(ddt)
-    return ddts
+    return list(_all_ddts())
 
 
 def get_ddt_probability(ddt: np.ndarray, delta_in: int, delta_out: int) -> float:
@@ -122,15 +126,15 @@ def find_best_differentials(ddt: np.ndarray, top_n: int = 5) -> List[Tuple[int,
 # CHARAKTERYSTYKI RÓŻNICOWE
 # ============================================================================
 
+@dataclass(eq=False, **DATACLASS_SLOTS)
 class DifferentialCharacteristic:
     """Reprezentuje wielorundową charakterystykę różnicową."""
     
-    def __init__(self, num_rounds: int):
-        self.num_rounds = num_rounds
-        self.input_diff = None  # Różnica wejściowa (L0, R0)
-        self.round_diffs = []   # Lista różnic po każdej rundzie
-        self.probability = 1.0
-        self.active_sboxes = []  # Aktywne S-bloki w każdej rundzie
+    num_rounds: int
+    input_diff: Optional[Tuple[int, int]] = None    # Różnica wejściowa (L0, R0)
+    round_diffs: List[Tuple[int, int]] = field(default_factory=list)  # Lista różnic po każdej rundzie
+    probability: float = 1.0
+    active_sboxes: List[List[int]] = field(default_factory=list)  # Aktywne S-bloki w każdej rundzie
     
     def __str__(self):
         return f"Charakterystyka {self.num_rounds}-rundowa, p = {self.probability:.6e}"
@@ -179,6 +183,16 @@ def build_6_round_characteristic() -> DifferentialCharacteristic:
 # ATAK RÓŻNICOWY
 # ============================================================================
 
+def _expanded_R15(C: int) -> int:
+    """
+    Zwraca E(R15) (48 bitów) odczytane z szyfrogramu (liczba całkowita).
+    
+    IP odwraca permutację końcową; po ostatniej rundzie blok ma postać
+    R16 || L16, a R15 = L16 to jego młodsze 32 bity.
+    """
+    return expand_e(ip_permute(C) & 0xFFFFFFFF)
+
+
 class DifferentialAttack:
     """Implementacja ataku różnicowego na zredukowany DES."""
     
@@ -192,7 +206,8 @@ class DifferentialAttack:
         self.num_rounds = num_rounds
         self.ddts = compute_all_ddts()
         self.characteristic = None
-        self.key_candidates = defaultdict(int)
+        # Wyniki hipotez klucza: [sbox_index][key_guess]
+        self.key_candidates = np.zeros((8, 64), dtype=np.int32)
         
     def set_characteristic(self, characteristic: DifferentialCharacteristic):
         """Ustawia charakterystykę różnicową do wykorzystania w ataku."""
@@ -202,6 +217,23 @@ class DifferentialAttack:
         """
         Generuje parę tekstów jawnych z zadaną różnicą.
         
+        Args:
+            delta_L: Różnica lewej połowy (32 bity)
+            delta_R: Różnica prawej połowy (32 bity)
+            
+        Returns:
+            Para (P, P') gdzie P XOR P' = (delta_L || delta_R)
+        """
+        P, P_prime = self.generate_plaintext_pair_fast(delta_L, delta_R)
+        return int_to_bits(P, 64), int_to_bits(P_prime, 64)
+    
+    def generate_plaintext_pair_fast(self, delta_L: int, delta_R: int) -> Tuple[int, int]:
+        """
+        Generuje parę tekstów jawnych z zadaną różnicą jako liczby całkowite.
+        
+        Cały 64-bitowy tekst jawny losowany jest jednym wywołaniem generatora
+        (z modułu random, więc random.seed() nadal zapewnia powtarzalność).
+        
         Args:
             delta_L: Różnica lewej połowy (32 bity)
             delta_R: Różnica prawej połowy (32 bity)
@@ -212,19 +244,19 @@ class DifferentialAttack:
         import random
         
         # Generujemy losowy tekst jawny P
-        P = [random.randint(0, 1) for _ in range(64)]
+        P = random.getrandbits(64)
         
         # Obliczamy P' = P XOR delta
-        delta = int_to_bits(delta_L, 32) + int_to_bits(delta_R, 32)
-        P_prime = xor(P, delta)
+        delta = (delta_L << 32) | delta_R
         
-        return P, P_prime
+        return P, P ^ delta
     
     def collect_pairs(self, 
                       oracle_func, 
                       num_pairs: int,
                       delta_L: int,
-                      delta_R: int) -> List[Tuple]:
+                      delta_R: int,
+                      batch_oracle_func=None) -> List[Tuple]:
         """
         Zbiera pary tekst jawny - szyfrogram.
         
@@ -233,18 +265,37 @@ class DifferentialAttack:
             num_pairs: Liczba par do zebrania
             delta_L: Różnica lewej połowy
             delta_R: Różnica prawej połowy
+            batch_oracle_func: Opcjonalna funkcja szyfrująca tablicę bloków
+                (np.uint64) jednym wywołaniem, np. make_batch_oracle()
             
         Returns:
             Lista krotek (P, P', C, C')
         """
-        pairs = []
+        import random
         
-        for _ in range(num_pairs):
-            P, P_prime = self.generate_plaintext_pair(delta_L, delta_R)
-            
-            C = oracle_func(P)
-            C_prime = oracle_func(P_prime)
-            
+        # Wszystkie teksty jawne P losowane są jednym wywołaniem NumPy, tak
+        # samo dla oracle wsadowego i pojedynczego; generator inicjowany jest
+        # z modułu random (random.seed() nadal zapewnia powtarzalność)
+        rng = np.random.default_rng(random.getrandbits(64))
+        P_all = rng.integers(0, 1 << 64, size=num_pairs, dtype=np.uint64)
+        delta = np.uint64((delta_L << 32) | delta_R)
+        
+        # Bloki w kolejności P, P' dla kolejnych par
+        blocks = np.stack([P_all, P_all ^ delta], axis=1).ravel()
+        
+        # Konwersja wszystkich bloków na bity naraz (np.unpackbits)
+        plain_bits = blocks_to_bits_array(blocks).tolist()
+        
+        if batch_oracle_func is not None:
+            # Jedno wywołanie oracle dla wszystkich 2 * num_pairs bloków
+            cipher_bits = blocks_to_bits_array(batch_oracle_func(blocks)).tolist()
+        else:
+            cipher_bits = [oracle_func(P) for P in plain_bits]
+        
+        pairs = []
+        for i in range(num_pairs):
+            P, P_prime = plain_bits[2 * i], plain_bits[2 * i + 1]
+            C, C_prime = cipher_bits[2 * i], cipher_bits[2 * i + 1]
             pairs.append((P, P_prime, C, C_prime))
         
         return pairs
@@ -264,114 +315,124 @@ class DifferentialAttack:
         Returns:
             Wyjście S-bloku (4 bity)
         """
-        # Odwracamy permutację końcową
-        after_ip_inv = permute(C, IP)  # To jest odwrotność FP
-        
-        # Po ostatniej rundzie: L16 || R16 (ale zamienione przed FP)
-        R16 = after_ip_inv[:32]
-        L16 = after_ip_inv[32:]
-        
-        # R15 = L16
-        R15 = L16
-        
-        # Rozszerzamy R15
-        expanded_R15 = permute(R15, E)
+        # Wejście S-bloku przed XOR z kluczem
+        input_bits = self.last_round_sbox_input(C, sbox_index)
         
-        # Wyciągamy 6 bitów dla danego S-bloku
-        start = sbox_index * 6
-        input_bits = expanded_R15[start:start + 6]
+        # XOR z zgadywanym fragmentem klucza i podstawienie S-bloku
+        return S_BOX_LOOKUP[sbox_index][input_bits ^ bits_to_int(subkey_guess)]
+    
+    def last_round_sbox_input(self, C: List[int], sbox_index: int) -> int:
+        """
+        Zwraca 6 bitów wejścia S-bloku ostatniej rundy (przed XOR z kluczem).
         
-        # XOR z zgadywanym fragmentem klucza
-        xored = xor(input_bits, subkey_guess)
+        Wartość nie zależy od zgadywanego klucza, więc w ataku liczona
+        jest raz na szyfrogram, a nie raz na każdą z 64 hipotez.
         
-        # Podstawienie S-bloku
-        xored_int = bits_to_int(xored)
-        row = ((xored_int >> 5) & 1) << 1 | (xored_int & 1)
-        col = (xored_int >> 1) & 0x0F
+        Args:
+            C: Szyfrogram (64 bity)
+            sbox_index: Indeks S-bloku (0-7)
+            
+        Returns:
+            6-bitowy fragment E(R15) dla danego S-bloku
+        """
+        # Rozszerzone R15 i 6 bitów dla danego S-bloku
+        return (_expanded_R15(bits_to_int(C)) >> (42 - 6 * sbox_index)) & 0x3F
+    
+    def last_round_sbox_inputs(self, ciphertexts: List[List[int]]) -> np.ndarray:
+        """
+        Oblicza wejścia wszystkich S-bloków ostatniej rundy dla wielu szyfrogramów.
         
-        sbox_output = S_BOXES[sbox_index][row][col]
+        Szyfrogramy pakowane są do np.uint64 jednym np.packbits, a IP i E
+        liczy wektorowo des.last_round_sbox_inputs (ta sama implementacja co
+        w ataku liniowym). Wynik obsługuje wszystkie S-bloki i hipotezy klucza
+        (attack_sbox, infer_expected_output_diff).
         
-        return sbox_output
+        Args:
+            ciphertexts: Lista szyfrogramów (po 64 bity)
+            
+        Returns:
+            Macierz uint8 o wymiarach (N, 8): [n][i] = 6 bitów E(R15) S-bloku i
+        """
+        bits = np.asarray(ciphertexts, dtype=np.uint8).reshape(-1, 64)
+        return last_round_sbox_inputs(bits_array_to_blocks(bits))
     
     def attack_sbox(self,
                     pairs: List[Tuple],
                     sbox_index: int,
-                    expected_output_diff: int) -> Tuple[int, Dict[int, int]]:
+                    expected_output_diff: int,
+                    sbox_inputs: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[int, np.ndarray]:
         """
         Atak na pojedynczy S-blok ostatniej rundy.
         
+        Wszystkie pary i 64 hipotezy klucza są sprawdzane jednocześnie
+        (macierz N x 64 operacji NumPy).
+        
         Args:
             pairs: Lista par (P, P', C, C')
             sbox_index: Indeks S-bloku do zaatakowania
             expected_output_diff: Oczekiwana różnica wyjściowa
+            sbox_inputs: Opcjonalnie wcześniej obliczone wejścia S-bloków
+                (last_round_sbox_inputs) dla C i C'
             
         Returns:
-            Tuple (best_key, scores_dict)
+            Tuple (best_key, scores) - scores[k] to liczba par zgodnych
+            z hipotezą klucza k (np.int32[64])
         """
-        scores = defaultdict(int)
-        
-        for P, P_prime, C, C_prime in pairs:
-            for key_guess in range(64):
-                key_bits = int_to_bits(key_guess, 6)
-                
-                # Częściowe odszyfrowanie dla obu szyfrogramów
-                out1 = self.partial_decrypt_last_round(C, key_bits, sbox_index)
-                out2 = self.partial_decrypt_last_round(C_prime, key_bits, sbox_index)
-                
-                # Sprawdzamy czy różnica wyjściowa zgadza się z oczekiwaną
-                output_diff = out1 ^ out2
-                
-                if output_diff == expected_output_diff:
-                    scores[key_guess] += 1
+        if sbox_inputs is None:
+            sbox_inputs = (self.last_round_sbox_inputs([pair[2] for pair in pairs]),
+                           self.last_round_sbox_inputs([pair[3] for pair in pairs]))
+        
+        in_C = sbox_inputs[0][:, sbox_index]
+        in_C_prime = sbox_inputs[1][:, sbox_index]
+        
+        lut = S_BOX_FLAT[sbox_index]
+        guesses = np.arange(64, dtype=np.uint8)
+        
+        # Częściowe odszyfrowanie dla obu szyfrogramów i wszystkich hipotez
+        out1 = lut[in_C[:, None] ^ guesses[None, :]]
+        out2 = lut[in_C_prime[:, None] ^ guesses[None, :]]
+        
+        # Zliczamy pary, dla których różnica wyjściowa zgadza się z oczekiwaną
+        scores = ((out1 ^ out2) == expected_output_diff).sum(axis=0, dtype=np.int32)
         
         # Znajdź klucz z najwyższym wynikiem
-        best_key = max(scores.keys(), key=lambda k: scores[k]) if scores else 0
+        best_key = int(scores.argmax())
         
-        return best_key, dict(scores)
-
+        return best_key, scores
+    
     def infer_expected_output_diff(self,
                                    pairs: List[Tuple],
-                                   sbox_index: int) -> Tuple[int, int, int]:
+                                   sbox_index: int,
+                                   sbox_inputs: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[int, int, int]:
         """
         Wnioskuje oczekiwaną różnicę wyjściową na podstawie histogramu Δin
         oraz tablicy DDT dla danego S-bloku.
         
+        Args:
+            pairs: Lista par (P, P', C, C')
+            sbox_index: Indeks S-bloku
+            sbox_inputs: Opcjonalnie wcześniej obliczone wejścia S-bloków
+                (last_round_sbox_inputs) dla C i C'
+        
         Returns:
             Tuple (delta_in, delta_out, histogram_count)
         """
-        histogram = defaultdict(int)
-        
-        for _, _, C, C_prime in pairs:
-            after_ip_inv = permute(C, IP)
-            after_ip_inv_prime = permute(C_prime, IP)
-            
-            R16 = after_ip_inv[:32]
-            L16 = after_ip_inv[32:]
-            R16_prime = after_ip_inv_prime[:32]
-            L16_prime = after_ip_inv_prime[32:]
-            
-            R15 = L16
-            R15_prime = L16_prime
-            
-            expanded_R15 = permute(R15, E)
-            expanded_R15_prime = permute(R15_prime, E)
-            
-            start = sbox_index * 6
-            input_bits = expanded_R15[start:start + 6]
-            input_bits_prime = expanded_R15_prime[start:start + 6]
-            
-            delta_in_bits = xor(input_bits, input_bits_prime)
-            delta_in = bits_to_int(delta_in_bits)
-            
-            if delta_in != 0:
-                histogram[delta_in] += 1
-        
-        if histogram:
-            delta_in = max(histogram.items(), key=lambda kv: kv[1])[0]
-            hist_count = histogram[delta_in]
+        if sbox_inputs is None:
+            sbox_inputs = (self.last_round_sbox_inputs([pair[2] for pair in pairs]),
+                           self.last_round_sbox_inputs([pair[3] for pair in pairs]))
+        
+        # Różnice wejściowe S-bloku dla wszystkich par
+        delta_ins = sbox_inputs[0][:, sbox_index] ^ sbox_inputs[1][:, sbox_index]
+        histogram = np.bincount(delta_ins, minlength=64)
+        histogram[0] = 0
+        
+        # Przy remisie wybieramy różnicę, która wystąpiła najwcześniej
+        hist_count = int(histogram.max())
+        if hist_count:
+            is_top = np.isin(delta_ins, np.flatnonzero(histogram == hist_count))
+            delta_in = int(delta_ins[is_top.argmax()])
         else:
             delta_in = 0
-            hist_count = 0
         
         ddt = self.ddts[sbox_index]
         delta_out = int(np.argmax(ddt[delta_in]))
@@ -380,13 +441,15 @@ class DifferentialAttack:
     
     def run_attack(self, 
                    oracle_func,
-                   num_pairs: int = 256) -> Dict[int, int]:
+                   num_pairs: int = 256,
+                   batch_oracle_func=None) -> Dict[int, int]:
         """
         Przeprowadza pełny atak różnicowy.
         
         Args:
             oracle_func: Funkcja szyfrująca (oracle)
             num_pairs: Liczba par do wykorzystania
+            batch_oracle_func: Opcjonalna wsadowa funkcja szyfrująca (oracle)
             
         Returns:
             Słownik {sbox_index: recovered_key_bits}
@@ -405,27 +468,34 @@ class DifferentialAttack:
         
         # Zbieramy pary
         print(f"\n[1] Zbieranie par tekst jawny - szyfrogram...")
-        pairs = self.collect_pairs(oracle_func, num_pairs, delta_L, delta_R)
+        pairs = self.collect_pairs(oracle_func, num_pairs, delta_L, delta_R,
+                                   batch_oracle_func)
         print(f"    Zebrano {len(pairs)} par")
         
         # Atak na każdy S-blok
         print(f"\n[2] Atak na S-bloki ostatniej rundy...")
         recovered_keys = {}
         
+        # Wejścia S-bloków ostatniej rundy liczymy raz dla wszystkich par
+        sbox_inputs = (self.last_round_sbox_inputs([pair[2] for pair in pairs]),
+                       self.last_round_sbox_inputs([pair[3] for pair in pairs]))
+        
         for sbox_idx in range(8):
             delta_in, expected_diff, hist_count = self.infer_expected_output_diff(
-                pairs, sbox_idx
+                pairs, sbox_idx, sbox_inputs
             )
             
             print(f"    S-blok {sbox_idx + 1}: "
                   f"Δin={delta_in:02X}, Δout*={expected_diff:02X}, "
                   f"hist={hist_count}")
             
-            best_key, scores = self.attack_sbox(pairs, sbox_idx, expected_diff)
+            best_key, scores = self.attack_sbox(pairs, sbox_idx, expected_diff,
+                                                sbox_inputs)
             recovered_keys[sbox_idx] = best_key
+            self.key_candidates[sbox_idx] = scores
             
-            if scores:
-                max_score = max(scores.values())
+            if scores.any():
+                max_score = int(scores.max())
                 print(f"    S-blok {sbox_idx + 1}: klucz = {best_key:02X} "
                       f"(6 bitów: {best_key:06b}), score = {max_score}")
             else:
@@ -479,8 +549,15 @@ def demonstrate_ddt():
         print(f"Maksymalna wartość (delta_in ≠ 0): {max_val}")
 
 
-def demonstrate_attack(num_rounds: int = 4):
-    """Demonstracja ataku różnicowego na 4-rundowy DES."""
+def demonstrate_attack(num_rounds: int = 4, use_batch_oracle: bool = True):
+    """
+    Demonstracja ataku różnicowego na 4-rundowy DES.
+    
+    Args:
+        num_rounds: Liczba rund (demonstracja obsługuje tylko 4)
+        use_batch_oracle: Czy szyfrować wszystkie bloki jednym wywołaniem
+            oracle wsadowego; False - oracle wywoływane osobno dla każdego bloku
+    """
     print("\n" + "=" * 60)
     print("DEMONSTRACJA ATAKU RÓŻNICOWEGO")
     print("=" * 60)
@@ -501,16 +578,24 @@ def demonstrate_attack(num_rounds: int = 4):
         num_rounds = 4
     
     # Tworzymy oracle - funkcję szyfrującą z nieznanym kluczem
+    # (zredukowany DES, 4 rundy, z podkluczami wpisanymi w kod funkcji)
+    encrypt_fixed_key = make_des_oracle(bits_to_int(key_bits), num_rounds=num_rounds)
+    
     def oracle(plaintext_bits):
-        # Używamy zredukowanego DES (4 rundy)
-        ciphertext, _, _ = des_encrypt_block_rounds(plaintext_bits, key_bits, num_rounds=num_rounds)
-        return ciphertext
+        return int_to_bits(encrypt_fixed_key(bits_to_int(plaintext_bits)), 64)
+    
+    # Wsadowe oracle - wszystkie bloki szyfrowane jednym wywołaniem NumPy.
+    # Dla 1000 bloków to ułamek milisekundy; des_fast (Numba, OpenSSL)
+    # kosztowałby więcej już samym importem i ładowaniem jądra
+    batch_oracle = None
+    if use_batch_oracle:
+        batch_oracle = make_batch_oracle(bits_to_int(key_bits), num_rounds=num_rounds)
     
     # Przeprowadzamy atak
     attack = DifferentialAttack(num_rounds=num_rounds)
     attack.set_characteristic(build_4_round_characteristic())
     
-    recovered_keys = attack.run_attack(oracle, num_pairs=500)
+    recovered_keys = attack.run_attack(oracle, num_pairs=500, batch_oracle_func=batch_oracle)
     
     # Weryfikacja
     print("\n" + "=" * 60)
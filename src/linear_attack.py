@@ -6,27 +6,45 @@ Autorzy: Projekt KRYS - Kryptografia Stosowana
 """
 
 import numpy as np
+from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import List, Dict, Tuple, Optional
-from collections import defaultdict
 from des import (
-    S_BOXES, E, P, IP, FP,
-    hex_to_bits, bits_to_hex, bits_to_int, int_to_bits,
-    permute, xor, generate_subkeys, feistel_function,
-    des_encrypt_block, des_encrypt_block_rounds
+    S_BOXES, S_BOX_LOOKUP, hex_to_int, ip_permute, expand_e,
+    generate_subkeys_fast, des_encrypt_blocks_bitslice, last_round_sbox_inputs,
+    load_or_compute_table
 )
+from compat import DATACLASS_SLOTS
 
 
 # ============================================================================
 # LINEAR APPROXIMATION TABLE (LAT)
 # ============================================================================
 
-def parity(x: int) -> int:
-    """Oblicza parzystość liczby (XOR wszystkich bitów)."""
-    result = 0
-    while x:
-        result ^= (x & 1)
-        x >>= 1
-    return result
+# Parzystość wszystkich wartości 6-bitowych (indeksowanie wektorowe NumPy)
+PARITY_LUT = np.array([bin(x).count('1') & 1 for x in range(64)], dtype=np.uint8)
+
+
+if hasattr(int, 'bit_count'):
+    def parity(x: int) -> int:
+        """Oblicza parzystość liczby (XOR wszystkich bitów)."""
+        return x.bit_count() & 1
+else:
+    # Python < 3.10
+    def parity(x: int) -> int:
+        """Oblicza parzystość liczby (XOR wszystkich bitów)."""
+        return bin(x).count('1') & 1
+
+
+# Pozycja w spłaszczonym S-bloku (4x16 -> 64) dla 6-bitowego wejścia x
+_SBOX_FLAT_INDEX = np.array(
+    [(((x >> 5) & 1) << 1 | (x & 1)) * 16 + ((x >> 1) & 0x0F) for x in range(64)]
+)
+
+
+def _sbox_outputs(sbox: List[List[int]]) -> np.ndarray:
+    """Wartości S-bloku (4x16) dla wszystkich 64 wejść 6-bitowych."""
+    return np.asarray(sbox).ravel()[_SBOX_FLAT_INDEX]
 
 
 def compute_lat(sbox: List[List[int]]) -> np.ndarray:
@@ -35,49 +53,71 @@ def compute_lat(sbox: List[List[int]]) -> np.ndarray:
     
     LAT[α][β] = #{x : parity(x & α) = parity(S(x) & β)} - 32
     
+    Parzystości liczone są naraz dla wszystkich x i masek (macierze
+    64x64 i 64x16), a zgodności zliczane sumą po osi x.
+    
     Args:
         sbox: S-blok w formacie 4x16
         
     Returns:
         Macierz LAT o wymiarach 64x16
     """
-    lat = np.zeros((64, 16), dtype=int)
+    x = np.arange(64)
+    masks = np.arange(64)
+    sx = _sbox_outputs(sbox)
     
-    for alpha in range(64):  # Maska wejściowa (6 bitów)
-        for beta in range(16):  # Maska wyjściowa (4 bity)
-            count = 0
-            
-            for x in range(64):
-                # Obliczamy wartość S-bloku dla x
-                row = ((x >> 5) & 1) << 1 | (x & 1)
-                col = (x >> 1) & 0x0F
-                sx = sbox[row][col]
-                
-                # Sprawdzamy równość parzystości
-                input_parity = parity(x & alpha)
-                output_parity = parity(sx & beta)
-                
-                if input_parity == output_parity:
-                    count += 1
-            
-            # LAT przechowuje odchylenie od 32 (wartości neutralnej)
-            lat[alpha][beta] = count - 32
+    # input_parity[x, α] i output_parity[x, β]
+    input_parity = PARITY_LUT[x[:, None] & masks[None, :]]
+    output_parity = PARITY_LUT[sx[:, None] & masks[None, :16]]
+    
+    matches = input_parity[:, :, None] == output_parity[:, None, :]
+    
+    # LAT przechowuje odchylenie od 32 (wartości neutralnej)
+    return matches.sum(axis=0, dtype=int) - 32
+
+
+def approximation_table(sbox: List[List[int]], alpha: int, beta: int) -> np.ndarray:
+    """
+    Oblicza wartości przybliżenia liniowego dla wszystkich wejść S-bloku.
+    
+    v[x] = parity(x & α) ^ parity(S(x) & β)
     
-    return lat
+    Args:
+        sbox: S-blok w formacie 4x16
+        alpha: Maska wejściowa (6 bitów)
+        beta: Maska wyjściowa (4 bity)
+        
+    Returns:
+        Tablica 64 wartości (0 - przybliżenie spełnione, 1 - niespełnione)
+    """
+    x = np.arange(64)
+    return PARITY_LUT[x & alpha] ^ PARITY_LUT[_sbox_outputs(sbox) & beta]
+
+
+@lru_cache(maxsize=None)
+def _all_lats() -> Tuple[np.ndarray, ...]:
+    """Tablice LAT wszystkich S-bloków (tylko do odczytu), zapisywane na dysku."""
+    tables = load_or_compute_table(
+        "des_lats", (8, 64, 16), int,
+        lambda: np.stack([compute_lat(sbox) for sbox in S_BOXES]),
+        version=1  # zwiększyć po każdej zmianie wyniku compute_lat
+    )
+    return tuple(tables)
 
 
 def compute_all_lats() -> List[np.ndarray]:
     """
     Oblicza tablice LAT dla wszystkich 8 S-bloków DES.
     
+    S-bloki są stałe, więc tablice liczone są tylko przy pierwszym
+    wywołaniu; kolejne (np. każdy nowy obiekt ataku) zwracają te same,
+    niemodyfikowalne macierze. Między uruchomieniami przechowuje je plik
+    .npy w TABLE_CACHE_DIR.
+    
     Returns:
         Lista 8 macierzy LAT
     """
-    lats = []
-    for sbox in S_BOXES:
-        lat = compute_lat(sbox)
-        lats.append(lat)
-    return lats
+    return list(_all_lats())
 
 
 def get_bias(lat: np.ndarray, alpha: int, beta: int) -> float:
@@ -109,39 +149,43 @@ def find_best_approximations(lat: np.ndarray, top_n: int = 5) -> List[Tuple[int,
     Returns:
         Lista krotek (alpha, beta, lat_value, bias)
     """
-    approximations = []
+    # Pomijamy alpha = 0 i beta = 0
+    values = lat[1:, 1:].ravel()
+    magnitudes = np.abs(values)
+    candidates = np.flatnonzero(magnitudes)
+    
+    if top_n < len(candidates):
+        # Próg: top_n-ta największa wartość |LAT| (np.partition, bez pełnego
+        # sortowania); wpisy równe progowi zostają, by remisy rozstrzygać
+        # w kolejności wierszy
+        threshold = np.partition(magnitudes[candidates], -top_n)[-top_n]
+        candidates = candidates[magnitudes[candidates] >= threshold]
     
-    for alpha in range(1, 64):  # Pomijamy alpha = 0
-        for beta in range(1, 16):  # Pomijamy beta = 0
-            lat_val = lat[alpha][beta]
-            if lat_val != 0:
-                bias = abs(lat_val) / 64.0
-                approximations.append((alpha, beta, lat_val, bias))
+    # Sortujemy po wartości bezwzględnej LAT (malejąco, stabilnie)
+    order = candidates[np.argsort(-magnitudes[candidates], kind='stable')][:top_n]
     
-    # Sortujemy po wartości bezwzględnej LAT (malejąco)
-    approximations.sort(key=lambda x: abs(x[2]), reverse=True)
+    approximations = []
+    for index in order:
+        alpha, beta = divmod(int(index), 15)
+        lat_val = int(values[index])
+        approximations.append((alpha + 1, beta + 1, lat_val, abs(lat_val) / 64.0))
     
-    return approximations[:top_n]
+    return approximations
 
 
 def best_lat_mask(lat: np.ndarray) -> Tuple[int, int, int]:
     """
     Zwraca (alpha, beta, lat_value) o maksymalnej wartości |LAT|.
-    Pomija maski zerowe.
+    Pomija maski zerowe. Przy remisie wybierana jest pierwsza para
+    (alpha, beta) w kolejności wierszy.
     """
-    best_alpha = 0
-    best_beta = 0
-    best_lat = 0
+    abs_lat = np.abs(lat[1:, 1:])
+    alpha, beta = np.unravel_index(np.argmax(abs_lat), abs_lat.shape)
     
-    for alpha in range(1, 64):
-        for beta in range(1, 16):
-            lat_val = lat[alpha][beta]
-            if abs(lat_val) > abs(best_lat):
-                best_lat = lat_val
-                best_alpha = alpha
-                best_beta = beta
+    if abs_lat[alpha, beta] == 0:
+        return 0, 0, 0
     
-    return best_alpha, best_beta, best_lat
+    return int(alpha) + 1, int(beta) + 1, int(lat[alpha + 1, beta + 1])
 
 
 # ============================================================================
@@ -197,16 +241,16 @@ def estimate_required_pairs(bias: float, success_probability: float = 0.95) -> i
 # CHARAKTERYSTYKA LINIOWA
 # ============================================================================
 
+@dataclass(eq=False, **DATACLASS_SLOTS)
 class LinearCharacteristic:
     """Reprezentuje wielorundową charakterystykę liniową."""
     
-    def __init__(self, num_rounds: int):
-        self.num_rounds = num_rounds
-        self.input_mask = None      # Maska bitów tekstu jawnego
-        self.output_mask = None     # Maska bitów szyfrogramu
-        self.key_mask = None        # Maska bitów klucza
-        self.bias = 0.0
-        self.approximations = []    # Przybliżenia dla każdej rundy
+    num_rounds: int
+    input_mask: Optional[int] = None    # Maska bitów tekstu jawnego
+    output_mask: Optional[int] = None   # Maska bitów szyfrogramu
+    key_mask: Optional[int] = None      # Maska bitów klucza
+    bias: float = 0.0
+    approximations: List[Tuple] = field(default_factory=list)  # Przybliżenia dla każdej rundy
     
     def __str__(self):
         return f"Charakterystyka liniowa {self.num_rounds}-rundowa, bias = {self.bias:.6e}"
@@ -254,6 +298,10 @@ def build_14_round_characteristic() -> LinearCharacteristic:
 # ATAK LINIOWY (ALGORYTM MATSUI 2)
 # ============================================================================
 
+# Indeks tablicy przybliżenia dla wejścia x i hipotezy klucza g: [x][g] = x ^ g
+_XOR_INDEX = np.arange(64)[:, None] ^ np.arange(64)[None, :]
+
+
 class LinearAttack:
     """Implementacja ataku liniowego na zredukowany DES (Algorytm Matsui 2)."""
     
@@ -267,14 +315,23 @@ class LinearAttack:
         self.num_rounds = num_rounds
         self.lats = compute_all_lats()
         self.characteristic = None
+        # Maski (alpha, beta, lat_value) o największym |LAT| dla każdego S-bloku
+        self.masks = [best_lat_mask(lat) for lat in self.lats]
+        # Wartości przybliżenia dla tych masek: [sbox_index][wejście S-bloku]
+        self.approx_luts = np.array([
+            approximation_table(sbox, alpha, beta)
+            for sbox, (alpha, beta, _) in zip(S_BOXES, self.masks)
+        ], dtype=np.uint8)
+        # Liczniki spełnienia przybliżenia: [sbox_index][key_guess]
+        self.counters = np.zeros((8, 64), dtype=np.int32)
         
     def set_characteristic(self, characteristic: LinearCharacteristic):
         """Ustawia charakterystykę liniową do wykorzystania."""
         self.characteristic = characteristic
         
     def compute_approximation_value(self,
-                                    ciphertext: List[int],
-                                    subkey_guess: List[int],
+                                    ciphertext: int,
+                                    subkey_guess: int,
                                     sbox_index: int,
                                     alpha: int,
                                     beta: int) -> int:
@@ -283,8 +340,8 @@ class LinearAttack:
         i zgadywanego fragmentu klucza.
         
         Args:
-            ciphertext: Szyfrogram (64 bity)
-            subkey_guess: Zgadywane 6 bitów podklucza
+            ciphertext: Szyfrogram (64-bitowa liczba całkowita)
+            subkey_guess: Zgadywane 6 bitów podklucza (liczba całkowita)
             sbox_index: Indeks S-bloku
             alpha: Maska wejściowa (6 bitów)
             beta: Maska wyjściowa (4 bity)
@@ -292,85 +349,103 @@ class LinearAttack:
         Returns:
             Wartość przybliżenia (0 lub 1)
         """
-        # Odwracamy permutację końcową
-        after_ip_inv = permute(ciphertext, IP)
+        # Odwracamy permutację końcową; R15 = L16 to młodsze 32 bity bloku
+        expanded_R15 = expand_e(ip_permute(ciphertext) & 0xFFFFFFFF)
         
-        R16 = after_ip_inv[:32]
-        L16 = after_ip_inv[32:]
+        # Wyciągamy 6 bitów dla danego S-bloku i XOR z zgadywanym kluczem
+        input_int = (expanded_R15 >> (42 - 6 * sbox_index)) & 0x3F
+        xored_int = input_int ^ subkey_guess
         
-        R15 = L16
+        # Podstawienie S-bloku (tablica indeksowana wprost 6-bitowym wejściem)
+        sbox_output = S_BOX_LOOKUP[sbox_index][xored_int]
         
-        # Rozszerzamy R15
-        expanded_R15 = permute(R15, E)
+        input_parity = parity(xored_int & alpha)
+        output_parity = parity(sbox_output & beta)
         
-        # Wyciągamy 6 bitów dla danego S-bloku
-        start = sbox_index * 6
-        input_bits = expanded_R15[start:start + 6]
+        return 0 if input_parity == output_parity else 1
+    
+    def last_round_sbox_inputs(self, ciphertexts: np.ndarray) -> np.ndarray:
+        """
+        Oblicza wejścia wszystkich S-bloków ostatniej rundy dla wielu szyfrogramów.
         
-        # XOR z zgadywanym fragmentem klucza
-        xored = xor(input_bits, subkey_guess)
-        xored_int = bits_to_int(xored)
+        Wspólna implementacja wektorowa: des.last_round_sbox_inputs.
         
-        # Podstawienie S-bloku
-        row = ((xored_int >> 5) & 1) << 1 | (xored_int & 1)
-        col = (xored_int >> 1) & 0x0F
-        sbox_output = S_BOXES[sbox_index][row][col]
+        Args:
+            ciphertexts: Szyfrogramy (np.uint64 lub lista liczb całkowitych)
+            
+        Returns:
+            Macierz uint8 o wymiarach (N, 8): [n][i] = 6 bitów E(R15) S-bloku i
+        """
+        return last_round_sbox_inputs(ciphertexts)
+    
+    def count_approximations(self,
+                             sbox_inputs: np.ndarray,
+                             sbox_index: Optional[int] = None) -> np.ndarray:
+        """
+        Zlicza pary spełniające przybliżenie dla S-bloków i wszystkich kluczy.
         
-        input_parity = parity(xored_int & alpha)
-        output_parity = parity(sbox_output & beta)
+        Wynik zależy od par tylko przez histogram wejść S-bloku h[x], więc
+        T[s][g] = Σ_x h[s][x] * [approx_luts[s][x ^ g] = 0] liczone jest dla
+        8 niezależnych S-bloków jednocześnie, bez macierzy N x 64.
         
-        return 0 if input_parity == output_parity else 1
+        Args:
+            sbox_inputs: Wejścia S-bloków (last_round_sbox_inputs), (N, 8)
+            sbox_index: Opcjonalnie indeks jedynego S-bloku do zliczenia
+            
+        Returns:
+            Macierz int32 (8, 64): [sbox_index][key_guess], a przy podanym
+            sbox_index wektor int32 (64,): [key_guess]
+        """
+        if sbox_index is not None:
+            # Tylko jeden wiersz - histogram i tablica spełnienia jednego S-bloku
+            histogram = np.bincount(sbox_inputs[:, sbox_index], minlength=64)
+            satisfied = self.approx_luts[sbox_index][_XOR_INDEX] == 0
+            return (histogram @ satisfied).astype(np.int32)
+        
+        # Histogramy wejść wszystkich S-bloków jednym wywołaniem bincount
+        offsets = 64 * np.arange(8)
+        histograms = np.bincount((sbox_inputs + offsets).ravel(), minlength=8 * 64).reshape(8, 64)
+        
+        # satisfied[s][x][g] - czy przybliżenie jest spełnione dla wejścia x i klucza g
+        satisfied = self.approx_luts[:, _XOR_INDEX] == 0
+        
+        return np.einsum('sx,sxg->sg', histograms, satisfied).astype(np.int32)
     
     def attack_sbox(self,
-                    pairs: List[Tuple[List[int], List[int]]],
-                    sbox_index: int) -> Tuple[int, Dict[int, int]]:
+                    pairs: List[Tuple[int, int]],
+                    sbox_index: int,
+                    sbox_inputs: Optional[np.ndarray] = None) -> Tuple[int, np.ndarray]:
         """
         Algorytm Matsui 2 - atak na pojedynczy S-blok.
         
+        Metoda niczego nie wypisuje; użyte maski (alpha, beta, lat_value)
+        są w self.masks[sbox_index], a raport drukuje run_attack.
+        
         Args:
             pairs: Lista par (plaintext, ciphertext)
             sbox_index: Indeks S-bloku do zaatakowania
+            sbox_inputs: Opcjonalnie wcześniej obliczone wejścia S-bloków
+                (last_round_sbox_inputs) dla szyfrogramów
             
         Returns:
-            Tuple (best_key, counters_dict)
+            Tuple (best_key, counters) - counters[k] to liczba par, dla których
+            przybliżenie jest spełnione przy hipotezie klucza k (np.int32[64])
         """
-        counters = defaultdict(int)
         N = len(pairs)
         
-        lat = self.lats[sbox_index]
-        alpha, beta, lat_val = best_lat_mask(lat)
-        bias = abs(lat_val) / 64.0
-        
-        print(f"    S-blok {sbox_index + 1}: wybrane maski "
-              f"α={alpha:02d}, β={beta:02d}, |LAT|={abs(lat_val):02d}, bias={bias:.4f}")
-        
-        for plaintext, ciphertext in pairs:
-            for key_guess in range(64):
-                key_bits = int_to_bits(key_guess, 6)
-                
-                # Obliczamy wartość przybliżenia
-                approx_val = self.compute_approximation_value(
-                    ciphertext, key_bits, sbox_index, alpha, beta
-                )
-                
-                # Jeśli przybliżenie jest spełnione, zwiększamy licznik
-                if approx_val == 0:
-                    counters[key_guess] += 1
+        if sbox_inputs is None:
+            sbox_inputs = self.last_round_sbox_inputs([pair[1] for pair in pairs])
         
-        # Znajdujemy klucz z największym odchyleniem od N/2
-        best_key = 0
-        max_deviation = 0
+        # Zliczamy pary, dla których przybliżenie jest spełnione
+        counters = self.count_approximations(sbox_inputs, sbox_index)
         
-        for key, count in counters.items():
-            deviation = abs(count - N // 2)
-            if deviation > max_deviation:
-                max_deviation = deviation
-                best_key = key
+        # Znajdujemy klucz z największym odchyleniem od N/2
+        best_key = int(np.argmax(np.abs(counters - N // 2)))
         
-        return best_key, dict(counters)
+        return best_key, counters
     
     def run_attack(self,
-                   pairs: List[Tuple[List[int], List[int]]]) -> Dict[int, int]:
+                   pairs: List[Tuple[int, int]]) -> Dict[int, int]:
         """
         Przeprowadza pełny atak liniowy.
         
@@ -394,24 +469,35 @@ class LinearAttack:
         print(f"\n[1] Atak na S-bloki ostatniej rundy (Algorytm Matsui 2)...")
         recovered_keys = {}
         
+        # Wejścia S-bloków ostatniej rundy liczymy raz dla wszystkich par
+        sbox_inputs = self.last_round_sbox_inputs([pair[1] for pair in pairs])
+        
+        # Ataki na S-bloki są niezależne - liczniki wszystkich naraz
+        N = len(pairs)
+        self.counters = self.count_approximations(sbox_inputs)
+        deviations = np.abs(self.counters - N // 2)
+        best_keys = np.argmax(deviations, axis=1)
+        
         for sbox_idx in range(8):
-            best_key, counters = self.attack_sbox(pairs, sbox_idx)
+            alpha, beta, lat_val = self.masks[sbox_idx]
+            bias = abs(lat_val) / 64.0
+            best_key = int(best_keys[sbox_idx])
             recovered_keys[sbox_idx] = best_key
             
-            if counters:
-                N = len(pairs)
-                count = counters.get(best_key, 0)
-                deviation = abs(count - N // 2)
+            print(f"    S-blok {sbox_idx + 1}: wybrane maski "
+                  f"α={alpha:02d}, β={beta:02d}, |LAT|={abs(lat_val):02d}, bias={bias:.4f}")
+            
+            if self.counters[sbox_idx].any():
+                deviation = int(deviations[sbox_idx, best_key])
                 print(f"    S-blok {sbox_idx + 1}: klucz = {best_key:02X} "
                       f"(6 bitów: {best_key:06b}), |T - N/2| = {deviation}")
         
         # Składamy odzyskane fragmenty klucza
         print(f"\n[2] Składanie odzyskanego podklucza...")
-        subkey_bits = []
+        subkey_int = 0
         for i in range(8):
-            subkey_bits.extend(int_to_bits(recovered_keys[i], 6))
+            subkey_int = (subkey_int << 6) | recovered_keys[i]
         
-        subkey_int = bits_to_int(subkey_bits)
         print(f"    Odzyskany podklucz K{self.num_rounds}: {subkey_int:012X}")
         
         print(f"\n{'=' * 60}")
@@ -488,7 +574,7 @@ def demonstrate_attack(num_rounds: int = 4):
     
     # Klucz do odzyskania
     key_hex = ''.join(random.choice('0123456789ABCDEF') for _ in range(16))
-    key_bits = hex_to_bits(key_hex)
+    key = hex_to_int(key_hex)
     
     print(f"\nKlucz (do odzyskania): {key_hex}")
     
@@ -500,18 +586,18 @@ def demonstrate_attack(num_rounds: int = 4):
     
     # Zbieramy pary tekst jawny - szyfrogram
     num_pairs = 1000
-    pairs = []
     
     print(f"\n[1] Generowanie {num_pairs} par tekst jawny - szyfrogram...")
     
-    for _ in range(num_pairs):
-        # Losowy tekst jawny
-        plaintext = [random.randint(0, 1) for _ in range(64)]
-        
-        # Szyfrujemy z ograniczoną liczbą rund
-        ciphertext, _, _ = des_encrypt_block_rounds(plaintext, key_bits, num_rounds=num_rounds)
-        
-        pairs.append((plaintext, ciphertext))
+    # Losowe teksty jawne (jedno wywołanie generatora NumPy); generator
+    # inicjowany jest z modułu random, więc random.seed() nadal decyduje o wyniku
+    rng = np.random.default_rng(random.getrandbits(64))
+    plaintexts = rng.integers(0, 1 << 64, size=num_pairs, dtype=np.uint64).tolist()
+    
+    # Szyfrujemy wszystkie bloki naraz (bitslice) z ograniczoną liczbą rund
+    ciphertexts = des_encrypt_blocks_bitslice(plaintexts, key, num_rounds=num_rounds)
+    
+    pairs = list(zip(plaintexts, ciphertexts))
     
     print(f"    Wygenerowano {len(pairs)} par")
     
@@ -526,13 +612,12 @@ def demonstrate_attack(num_rounds: int = 4):
     print("WERYFIKACJA")
     print("=" * 60)
     
-    true_subkeys = generate_subkeys(key_bits)
-    true_k4 = true_subkeys[3]
+    true_k4 = generate_subkeys_fast(key)[3]
     
     matches = 0
     print(f"\nPrawdziwy podklucz K4:")
     for i in range(8):
-        true_6bits = bits_to_int(true_k4[i*6:(i+1)*6])
+        true_6bits = (true_k4 >> (42 - 6 * i)) & 0x3F
         recovered = recovered_keys.get(i, -1)
         match = "✓" if true_6bits == recovered else "✗"
         if true_6bits == recovered:
@@ -57,6 +57,92 @@ def run_des_tests():
         if not (encrypt_ok and decrypt_ok):
             all_passed = False
     
+    if not check_des_implementations(test_vectors):
+        all_passed = False
+    
+    return all_passed
+
+
+def check_des_implementations(test_vectors) -> bool:
+    """
+    Sprawdza alternatywne implementacje DES na wektorach testowych.
+    
+    Każdy wektor szyfrowany jest pełnym DES (wzorzec: oczekiwany szyfrogram)
+    oraz DES 4-rundowym (wzorzec: des_encrypt_block_rounds) przez wszystkie
+    ścieżki: bitslice, NumPy, oracle generowane przez exec, Numba i OpenSSL.
+    
+    Args:
+        test_vectors: Lista słowników z kluczami "key", "plaintext", "expected"
+        
+    Returns:
+        True, jeśli wszystkie implementacje zwróciły oczekiwane szyfrogramy
+    """
+    import numpy as np
+    import des_fast
+    from des import (
+        hex_to_int, hex_to_bits, bits_to_int, des_encrypt_block_rounds,
+        des_encrypt_blocks_bitslice, des_encrypt_many, make_des_oracle
+    )
+    
+    print("\n" + "-" * 70)
+    print("Zgodność implementacji alternatywnych (16 i 4 rundy)")
+    print(f"  Numba: {'tak' if des_fast.HAVE_NUMBA else 'nie'}, "
+          f"OpenSSL: {'tak' if des_fast.HAVE_OPENSSL else 'nie'}")
+    
+    # Przypadki (klucz, tekst jawny, liczba rund, oczekiwany szyfrogram)
+    cases = []
+    for tv in test_vectors:
+        key, plaintext = hex_to_int(tv["key"]), hex_to_int(tv["plaintext"])
+        cases.append((key, plaintext, 16, hex_to_int(tv["expected"])))
+        
+        reduced, _, _ = des_encrypt_block_rounds(hex_to_bits(tv["plaintext"]),
+                                                 hex_to_bits(tv["key"]), num_rounds=4)
+        cases.append((key, plaintext, 4, bits_to_int(reduced)))
+    
+    # Tablica PARALLEL_MIN_BLOCKS kopii bloku, by des_encrypt_many_fast
+    # użyło jądra Numba (lub puli procesów), a nie des_encrypt_many
+    def encrypt_many_fast(key, plaintext, num_rounds):
+        blocks = np.full(des_fast.PARALLEL_MIN_BLOCKS, plaintext, dtype=np.uint64)
+        return des_fast.des_encrypt_many_fast(blocks, key, num_rounds)
+    
+    # Każda ścieżka zwraca szyfrogram lub tablicę szyfrogramów
+    implementations = [
+        ("des_encrypt_blocks_bitslice",
+         lambda key, plaintext, num_rounds:
+             des_encrypt_blocks_bitslice([plaintext], key, num_rounds=num_rounds)),
+        ("des_encrypt_many",
+         lambda key, plaintext, num_rounds:
+             des_encrypt_many(np.array([plaintext], dtype=np.uint64), key, num_rounds)),
+        ("make_des_oracle",
+         lambda key, plaintext, num_rounds: make_des_oracle(key, num_rounds)(plaintext)),
+        ("des_fast.des_encrypt_block_fast",
+         lambda key, plaintext, num_rounds:
+             des_fast.des_encrypt_block_fast(plaintext, key, num_rounds)),
+        ("des_fast.des_encrypt_many_fast", encrypt_many_fast),
+    ]
+    
+    all_passed = True
+    
+    for name, encrypt_fn in implementations:
+        ok = all(
+            np.all(np.asarray(encrypt_fn(key, plaintext, num_rounds), dtype=np.uint64) == expected)
+            for key, plaintext, num_rounds, expected in cases
+        )
+        print(f"  {'✓ PASS' if ok else '✗ FAIL'}  {name}")
+        all_passed = all_passed and ok
+    
+    # OpenSSL szyfruje wyłącznie pełny 16-rundowy DES
+    name = "des_fast.make_openssl_batch_oracle"
+    if des_fast.HAVE_OPENSSL:
+        ok = all(
+            int(des_fast.make_openssl_batch_oracle(key)(np.array([plaintext], dtype=np.uint64))[0]) == expected
+            for key, plaintext, num_rounds, expected in cases if num_rounds == 16
+        )
+        print(f"  {'✓ PASS' if ok else '✗ FAIL'}  {name} (16 rund)")
+        all_passed = all_passed and ok
+    else:
+        print(f"  - pominięto  {name} (brak pakietu cryptography)")
+    
     return all_passed
 
 
@@ -70,7 +156,7 @@ def run_differential_analysis():
     demonstrate_ddt()
 
 
-def run_differential_attack(num_rounds: int = 4):
+def run_differential_attack(num_rounds: int = 4, use_batch_oracle: bool = True):
     """Uruchamia demonstrację ataku różnicowego."""
     print("\n" + "=" * 70)
     print(" " * 15 + "DEMONSTRACJA ATAKU RÓŻNICOWEGO")
@@ -86,7 +172,7 @@ def run_differential_attack(num_rounds: int = 4):
     
     print(f"\nUżywane rundy (demo): {num_rounds}")
     print("Uwaga: pełny DES wymaga ok. 2^47 par dla ataku różnicowego.")
-    demonstrate_attack(num_rounds=num_rounds)
+    demonstrate_attack(num_rounds=num_rounds, use_batch_oracle=use_batch_oracle)
 
 
 def run_linear_analysis():
@@ -119,7 +205,7 @@ def run_linear_attack(num_rounds: int = 4):
     demonstrate_attack(num_rounds=num_rounds)
 
 
-def run_all(num_rounds: int = 4):
+def run_all(num_rounds: int = 4, use_batch_oracle: bool = True):
     """Uruchamia wszystkie demonstracje."""
     print("\n" + "#" * 70)
     print("#" + " " * 68 + "#")
@@ -154,7 +240,7 @@ def run_all(num_rounds: int = 4):
     if num_rounds >= 16:
         print("\n⚠️  Ostrzeżenie: pełny 16-rundowy DES jest niepraktyczny")
         print("    dla demonstracyjnych ataków (wymaga ~2^43–2^47 par).")
-    run_differential_attack(num_rounds)
+    run_differential_attack(num_rounds, use_batch_oracle)
     
     # 4. Analiza LAT
     print("\n\n" + "▶" * 30)
@@ -189,6 +275,7 @@ Przykłady użycia:
   python main.py                    # Uruchom wszystkie demonstracje
   python main.py --test-des         # Tylko testy DES
   python main.py --differential     # Tylko atak różnicowy
+  python main.py --differential --per-block-oracle  # Oracle wywoływane dla każdego bloku
   python main.py --linear           # Tylko atak liniowy
   python main.py --analyze-ddt      # Tylko analiza DDT
   python main.py --analyze-lat      # Tylko analiza LAT
@@ -207,6 +294,8 @@ Przykłady użycia:
                         help='Uruchom analizę tablic LAT')
     parser.add_argument('--all', action='store_true',
                         help='Uruchom wszystkie demonstracje (domyślnie)')
+    parser.add_argument('--per-block-oracle', action='store_true',
+                        help='W ataku różnicowym szyfruj każdy blok osobnym wywołaniem oracle')
     parser.add_argument('--rounds', type=int, default=4,
                         help='Liczba rund używana w demonstracjach ataków (domyślnie 4)')
     
@@ -218,7 +307,7 @@ Przykłady użycia:
         args.all = True
     
     if args.all:
-        run_all(args.rounds)
+        run_all(args.rounds, not args.per_block_oracle)
     else:
         if args.test_des:
             run_des_tests()
@@ -228,7 +317,7 @@ Przykłady użycia:
             if args.rounds >= 16:
                 print("\n⚠️  Ostrzeżenie: pełny 16-rundowy DES jest niepraktyczny")
                 print("    dla demonstracyjnych ataków (wymaga ~2^43–2^47 par).")
-            run_differential_attack(args.rounds)
+            run_differential_attack(args.rounds, not args.per_block_oracle)
         if args.analyze_lat:
             run_linear_analysis()
         if args.linear: